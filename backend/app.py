@@ -1,18 +1,70 @@
 from gevent import monkey
 monkey.patch_all()
 
+import gevent
+import gevent.lock
+from gevent.event import AsyncResult
+from gevent.pool import Pool
+
 import os
 import json
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-import fitz  # PyMuPDF
-from PIL import Image
-import tempfile
-from google import genai
+from werkzeug.wsgi import wrap_file
+from werkzeug.http import is_resource_modified
+import importlib
+from typing import Annotated
 import uuid  # For unique filenames
 import shutil  # For copying/moving files
 import re  # For extracting name from parsed text
+import hashlib  # For content-addressed caching
+import base64  # For opaque pagination cursors
+import sqlite3  # Metadata store
+from contextlib import closing, contextmanager
+import time
+import zipfile  # For bulk zip uploads
+import tempfile
+import gzip  # For compressed text artifacts
+import io
+import csv  # For candidate export
+from datetime import datetime, timezone
+import threading
+import contextvars
+import functools
+import random
+import math
+from collections import namedtuple
+from collections import OrderedDict
+
+# --- Lazy Imports ---
+# PyMuPDF, Pillow and google-genai account for most of the import time, so they are loaded on
+# first use instead of at worker boot. With `gunicorn --preload` and STARTUP_WARM_IMPORTS=1,
+# create_app() loads them once in the master and the forked workers share them.
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+fitz = LazyModule("fitz")  # PyMuPDF
+Image = LazyModule("PIL.Image")
+genai = LazyModule("google.genai")
+genai_types = LazyModule("google.genai.types")
+httpx = LazyModule("httpx")  # Transport errors raised by the google-genai client
+boto3 = LazyModule("boto3")  # Only needed for STORAGE_BACKEND='s3'
+HEAVY_MODULES = {"fitz": fitz, "PIL.Image": Image, "google.genai": genai, "google.genai.types": genai_types}
 
 app = Flask(__name__)
 
@@ -20,59 +72,1538 @@ app = Flask(__name__)
 frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 CORS(app, resources={r"/*": {"origins": frontend_url}})
 
+# --- Metrics (Prometheus text format) ---
+# Hot-path stages and every model call are timed into in-process histograms served on /metrics.
+# Each gunicorn worker keeps its own registry, so Prometheus should scrape per worker or sum by instance.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 10))
+TRACE_REQUEST_HEADER = 'X-Request-Trace'
+
+class Metric:
+    def __init__(self, name, help_text, kind):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted(labels.items()))
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = [*labels, *extra]
+        if not pairs:
+            return ""
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_items(items))
+        return lines
+
+class Counter(Metric):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, "counter")
+
+    def inc(self, amount=1, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_items(self, items):
+        return [f"{self.name}{self._format_labels(labels)} {value}" for labels, value in items]
+
+class Gauge(Counter):
+    def __init__(self, name, help_text):
+        Metric.__init__(self, name, help_text, "gauge")
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._labels(labels)] = value
+
+class Histogram(Metric):
+    def __init__(self, name, help_text, buckets):
+        super().__init__(name, help_text, "histogram")
+        self.buckets = buckets
+        self._observations = {}
+
+    def observe(self, value, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: counts[i] += 1
+            self._values[key] = (counts, total + value)
+            self._observations[key] = self._observations.get(key, 0) + 1
+
+    def _render_items(self, items):
+        lines = []
+        for labels, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._format_labels(labels, [('le', f'{bound:g}')])} {count}")
+            observations = self._observations[labels]
+            lines.append(f"{self.name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {observations}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {observations}")
+        return lines
+
+STAGE_SECONDS = Histogram("resume_ai_stage_seconds", "Time spent in each hot-path stage.", LATENCY_BUCKETS)
+HTTP_REQUEST_SECONDS = Histogram("resume_ai_http_request_seconds", "HTTP request latency by endpoint.", LATENCY_BUCKETS)
+LLM_CALL_SECONDS = Histogram("resume_ai_llm_call_seconds", "Model call latency by task.", LATENCY_BUCKETS)
+LLM_PROMPT_CHARS = Histogram("resume_ai_llm_prompt_chars", "Characters of text sent per model call.", SIZE_BUCKETS)
+LLM_RESPONSE_CHARS = Histogram("resume_ai_llm_response_chars", "Characters of text returned per model call.", SIZE_BUCKETS)
+LLM_TOKENS = Counter("resume_ai_llm_tokens_total", "Tokens reported by the model API, by task and kind.")
+LLM_CALLS = Counter("resume_ai_llm_calls_total", "Model calls by task and outcome.")
+LLM_QUEUE_WAIT_SECONDS = Histogram("resume_ai_llm_queue_wait_seconds", "Time model calls wait for a concurrency slot and rate-limit token.", LATENCY_BUCKETS)
+LLM_QUEUE_DEPTH = Gauge("resume_ai_llm_queue_depth", "Model calls currently waiting in the governor, by task.")
+LLM_IN_FLIGHT = Gauge("resume_ai_llm_in_flight", "Model calls currently running, by task.")
+LLM_RETRIES = Counter("resume_ai_llm_retries_total", "Retried model calls by task.")
+LLM_COALESCED = Counter("resume_ai_llm_coalesced_total", "Model calls answered by an identical in-flight call, by task.")
+BLOB_DEDUPED = Counter("resume_ai_blob_deduplicated_total", "Saved artifacts whose content was already in the blob store, by kind.")
+UPLOADS_REJECTED = Counter("resume_ai_uploads_rejected_total", "Uploads rejected before parsing, by reason.")
+TEMP_UPLOADS_REAPED = Counter("resume_ai_temp_uploads_reaped_total", "Unconfirmed temp uploads deleted by the reaper, by reason.")
+TEMP_UPLOAD_BYTES = Gauge("resume_ai_temp_upload_bytes", "Bytes held by temp uploads after the last reaper pass.")
+METRICS = [HTTP_REQUEST_SECONDS, STAGE_SECONDS, LLM_CALL_SECONDS, LLM_PROMPT_CHARS, LLM_RESPONSE_CHARS, LLM_TOKENS, LLM_CALLS,
+           LLM_QUEUE_WAIT_SECONDS, LLM_QUEUE_DEPTH, LLM_IN_FLIGHT, LLM_RETRIES, LLM_COALESCED, BLOB_DEDUPED,
+           UPLOADS_REJECTED, TEMP_UPLOADS_REAPED, TEMP_UPLOAD_BYTES]
+
+def record_trace(name, seconds):
+    """Adds a timing to the current request's trace (used for Server-Timing and slow-request logs)."""
+    if has_request_context():
+        g.setdefault("trace", []).append((name, seconds))
+
+class stage_timer:
+    """`with stage_timer("render"):` observes the block into resume_ai_stage_seconds{stage="render"}."""
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        record_trace(self.stage, elapsed)
+        return False
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def finish_request_timer(response):
+    elapsed = time.perf_counter() - g.get("request_start", time.perf_counter())
+    HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "unmatched", method=request.method, status=str(response.status_code))
+    trace = g.get("trace", [])
+    if request.headers.get(TRACE_REQUEST_HEADER) and trace:
+        response.headers["Server-Timing"] = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in trace)
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        stages = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in trace)
+        print(f"Slow request: {request.method} {request.path} took {elapsed:.2f}s [{stages}]")
+    return response
+
 # --- CHANGE 2: API KEY CONFIGURATION FOR DEPLOYMENT ---
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY environment variable not set!")
-client = genai.Client(api_key=api_key)
+# --- LLM Providers ---
+# All model calls go through get_llm(). LLM_PROVIDER='gemini' (default) talks to the Gemini API;
+# LLM_PROVIDER='fake' returns canned, schema-valid responses with configurable latency and
+# injected errors, for offline benchmarks and regression tests of the server's own overhead.
+LLMResponse = namedtuple("LLMResponse", ["text", "prompt_tokens", "output_tokens"])
+
+class GeminiProvider:
+    def __init__(self, api_key):
+        self.client = genai.Client(api_key=api_key)
+
+    @staticmethod
+    def _response(response):
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(response.text or "", getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None))
+
+    def generate(self, model, contents, config=None):
+        return self._response(self.client.models.generate_content(model=model, contents=contents, config=config))
+
+    def generate_stream(self, model, contents, config=None):
+        for chunk in self.client.models.generate_content_stream(model=model, contents=contents, config=config):
+            yield self._response(chunk)
+
+class FakeLLMError(Exception):
+    code = 503  # Treated like a transient provider error by the call governor
+
+class FakeProvider:
+    """
+    Stand-in model: picks a canned response from the prompt, sleeps for
+    FAKE_LLM_LATENCY_MS (+/- FAKE_LLM_JITTER_MS) and fails FAKE_LLM_ERROR_RATE of calls.
+    """
+    RESUME_JSON = {
+        "name": "Jane Doe", "email": "jane.doe@example.com", "phone": "+1 555 123 4567",
+        "education": [{"degree": "B.S. Computer Science", "institution": "State University", "years": "2016-2020", "location": "Springfield"}],
+        "skills": {"Programming Languages": ["Python", "SQL", "JavaScript"], "Frameworks": ["Flask", "React"], "Tools": ["Git", "Docker"]},
+        "experience": [{"title": "Software Engineer", "company": "Acme Corp", "dates": "Jul 2020 - Present",
+                        "responsibilities": ["Built REST APIs in Flask", "Cut p95 latency by 40%"]}],
+        "projects": [{"name": "Resume Screener", "technologies": ["Python", "Gemini"], "outcomes": ["Automated first-pass screening"]}],
+    }
+    CANNED = [
+        ("AI resume parser", "```json\n" + json.dumps(RESUME_JSON, indent=2) + "\n```"),
+        ("Fit Score", "Score: 7.5/10\n\n### Justification:\n* **Skill Alignment:** Strong Python and Flask overlap.\n"
+                      "* **Experience Relevance:** Relevant backend experience.\n* **Overall Suitability:** Good candidate.\n"
+                      "* **Areas for Improvement:**\n    * Quantify achievements.\n    * Add cloud experience."),
+        ("skill match table", "| Skill | Mentioned in Resume | Required by JD | Match Score (0-1) |\n|---|---|---|---|\n"
+                              "| Python | Yes | Yes | 1.0 |\n| SQL | Yes | Yes | 0.8 |\n| Kubernetes | No | Yes | 0.0 |"),
+        ("Interview Questions", "## Technical Interview Questions\n| Question | Best Answer |\n|---|---|\n| What is REST? | An architectural style. |\n\n"
+                                "## Behavioral Interview Questions\n| Question | Best Answer |\n|---|---|\n| Tell me about a challenge. | I fixed a production bug. |\n\n"
+                                "## Scenario-Based Interview Questions\n| Question | Best Answer |\n|---|---|\n| A deploy breaks login. | Roll back, then debug. |"),
+        ("Review the following resume text", "* **Grammar and spelling issues:** None found.\n* **Quantifiable achievements:** Add metrics to the Acme Corp role."),
+    ]
+    _replies = dict(CANNED)
+    CANNED.insert(0, ("You are screening a candidate", json.dumps({
+        "resume_check": _replies["Review the following resume text"], "jd_match": _replies["skill match table"],
+        "generate_questions": _replies["Interview Questions"], "fit_score": _replies["Fit Score"]})))
+    # Multi-JD scoring echoes back every role in the prompt with a score derived from its name
+    CANNED.insert(0, ("fits EACH of the job descriptions", lambda contents: json.dumps([
+        {"role": role, "score": round(5 + len(role) % 5, 1), "justification": "Solid overlap on core skills."}
+        for role in re.findall(r"^Role: (.+)$", "\n".join(c for c in contents if isinstance(c, str)), re.M)])))
+
+    def __init__(self, latency_ms, jitter_ms, error_rate, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    def _respond(self, contents):
+        prompt = next((c for c in contents if isinstance(c, str)), "")
+        delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        gevent.sleep(delay)
+        if self.random.random() < self.error_rate:
+            raise FakeLLMError("503 UNAVAILABLE: injected fake LLM failure")
+        text = next((reply for marker, reply in self.CANNED if marker in prompt), "OK")
+        if callable(text):
+            text = text(contents)
+        prompt_chars = sum(len(c) for c in contents if isinstance(c, str))
+        return LLMResponse(text, prompt_chars // 4, len(text) // 4)
+
+    def generate(self, model, contents, config=None):
+        return self._respond(contents)
+
+    def generate_stream(self, model, contents, config=None):
+        response = self._respond(contents)
+        step = max(1, len(response.text) // 8)
+        for i in range(0, len(response.text), step):
+            if i: gevent.sleep(self.latency_ms / 8000)
+            yield LLMResponse(response.text[i:i + step], None, None)
+
+def make_llm_provider(name):
+    if name == 'fake':
+        return FakeProvider(
+            latency_ms=float(os.getenv('FAKE_LLM_LATENCY_MS', 800)), jitter_ms=float(os.getenv('FAKE_LLM_JITTER_MS', 200)),
+            error_rate=float(os.getenv('FAKE_LLM_ERROR_RATE', 0)), seed=os.getenv('FAKE_LLM_SEED'))
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY environment variable not set!")
+    return GeminiProvider(api_key)
+
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini')
+_llm = None
+_llm_pid = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """
+    The process's model client, built on first use (so a missing API key fails the model call, not the boot).
+    It is rebuilt in each forked worker so no process reuses a client or connection pool created before the fork.
+    """
+    global _llm, _llm_pid
+    if _llm is None or _llm_pid != os.getpid():
+        with _llm_lock:
+            if _llm is None or _llm_pid != os.getpid():
+                _llm, _llm_pid = make_llm_provider(LLM_PROVIDER), os.getpid()
+    return _llm
+
+def llm_configured():
+    return LLM_PROVIDER == 'fake' or bool(os.getenv("GOOGLE_API_KEY"))
+
+def text_chars(contents):
+    return sum(len(c) for c in contents if isinstance(c, str))
+
+def record_llm_usage(task, prompt_chars, response_chars, prompt_tokens, output_tokens):
+    LLM_PROMPT_CHARS.observe(prompt_chars, task=task)
+    LLM_RESPONSE_CHARS.observe(response_chars, task=task)
+    if prompt_tokens: LLM_TOKENS.inc(prompt_tokens, task=task, kind="prompt")
+    if output_tokens: LLM_TOKENS.inc(output_tokens, task=task, kind="output")
+
+# --- LLM Call Governor ---
+# Every model call passes through `governor`: a global and a per-task concurrency limit, a
+# token-bucket rate limit, jittered exponential retry on transient errors, and single-flight
+# coalescing so identical concurrent text requests share one upstream call.
+# The limits are PER WORKER PROCESS: with `gunicorn -w N` the API key sees up to N times each
+# of them, so size them as (provider limit / number of workers across all hosts). The old
+# unsuffixed names (LLM_MAX_CONCURRENCY, ...) are still read as a fallback.
+def per_worker_env(name, default):
+    return os.getenv(f'{name}_PER_WORKER', os.getenv(name, default))
+
+LLM_MAX_CONCURRENCY_PER_WORKER = int(per_worker_env('LLM_MAX_CONCURRENCY', 16))
+LLM_TASK_MAX_CONCURRENCY_PER_WORKER = int(per_worker_env('LLM_TASK_MAX_CONCURRENCY', 8))
+LLM_RATE_PER_SECOND_PER_WORKER = float(per_worker_env('LLM_RATE_PER_SECOND', 10))
+LLM_RATE_BURST_PER_WORKER = int(per_worker_env('LLM_RATE_BURST', 20))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 8))
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+def is_retryable(error):
+    if getattr(error, "code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = gevent.lock.Semaphore()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:  # Waiters queue up here in arrival order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                gevent.sleep((1 - self.tokens) / self.rate)
+
+class LLMGovernor:
+    def __init__(self, max_concurrency, task_concurrency, rate, burst, max_retries, base_delay, max_delay):
+        self.global_slots = gevent.lock.BoundedSemaphore(max_concurrency)
+        self.task_concurrency = task_concurrency
+        self.task_slots = {}
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight_calls = {}  # coalescing key -> AsyncResult
+        self.waiting = {}
+        self.running = {}
+        self.stats = {"calls": 0, "coalesced": 0, "retries": 0, "wait_seconds_total": 0.0, "max_wait_seconds": 0.0}
+
+    def _adjust(self, counters, gauge, task, delta):
+        counters[task] = counters.get(task, 0) + delta
+        gauge.set(counters[task], task=task)
+
+    @contextmanager
+    def slot(self, task):
+        """Holds a per-task and a global concurrency slot plus one rate-limit token for the block."""
+        task_slots = self.task_slots.setdefault(task, gevent.lock.BoundedSemaphore(self.task_concurrency))
+        start = time.perf_counter()
+        self._adjust(self.waiting, LLM_QUEUE_DEPTH, task, 1)
+        try:
+            task_slots.acquire()
+            try:
+                self.global_slots.acquire()
+            except BaseException:
+                task_slots.release()  # e.g. a gevent.Timeout while queued for the global slot
+                raise
+        finally:
+            self._adjust(self.waiting, LLM_QUEUE_DEPTH, task, -1)
+        try:
+            self.bucket.acquire()
+            waited = time.perf_counter() - start
+            LLM_QUEUE_WAIT_SECONDS.observe(waited, task=task)
+            record_trace(f"llm_queue_{task}", waited)
+            self.stats["calls"] += 1
+            self.stats["wait_seconds_total"] += waited
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+            self._adjust(self.running, LLM_IN_FLIGHT, task, 1)
+            try:
+                yield
+            finally:
+                self._adjust(self.running, LLM_IN_FLIGHT, task, -1)
+        finally:
+            self.global_slots.release()
+            task_slots.release()
+
+    def backoff(self, task, attempt):
+        LLM_RETRIES.inc(task=task)
+        self.stats["retries"] += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        gevent.sleep(random.uniform(0, delay))  # Full jitter
+
+    def call(self, task, fn, coalesce_key=None):
+        """
+        Runs fn() under the limits with retries; concurrent calls with the same coalesce_key share one result.
+        The shared call runs in its own greenlet, so a caller that times out or is killed only stops
+        waiting and never cancels the call for the others.
+        """
+        if coalesce_key is None:
+            return self._call_with_retries(task, fn)
+        pending = self.in_flight_calls.get(coalesce_key)
+        if pending is not None:
+            LLM_COALESCED.inc(task=task)
+            self.stats["coalesced"] += 1
+        else:
+            pending = self.in_flight_calls[coalesce_key] = AsyncResult()
+            runner = gevent.Greenlet(self._run_shared, task, fn, coalesce_key, pending)
+            runner.gr_context = contextvars.copy_context()  # Keeps the first caller's request trace
+            runner.start()
+        return pending.get()
+
+    def _run_shared(self, task, fn, coalesce_key, pending):
+        try:
+            pending.set(self._call_with_retries(task, fn))
+        except Exception as e:
+            pending.set_exception(e)
+        finally:
+            self.in_flight_calls.pop(coalesce_key, None)
+
+    def _call_with_retries(self, task, fn):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.slot(task):
+                    return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+            self.backoff(task, attempt)
+
+    def snapshot(self):
+        stats = dict(self.stats)
+        stats["avg_wait_seconds"] = round(stats["wait_seconds_total"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["queue_depth"] = {task: n for task, n in self.waiting.items() if n}
+        stats["in_flight"] = {task: n for task, n in self.running.items() if n}
+        stats["in_flight_coalescable"] = len(self.in_flight_calls)
+        stats["limits"] = {"scope": "per_worker", "pid": os.getpid(),
+                           "max_concurrency": LLM_MAX_CONCURRENCY_PER_WORKER, "task_max_concurrency": self.task_concurrency,
+                           "rate_per_second": self.bucket.rate, "burst": self.bucket.capacity, "max_retries": self.max_retries}
+        return stats
+
+governor = LLMGovernor(LLM_MAX_CONCURRENCY_PER_WORKER, LLM_TASK_MAX_CONCURRENCY_PER_WORKER, LLM_RATE_PER_SECOND_PER_WORKER, LLM_RATE_BURST_PER_WORKER,
+                       LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY)
+
+def coalesce_key_for(task, model, contents, config):
+    """Only all-text requests are coalesced; image payloads are unique per upload anyway."""
+    if not all(isinstance(c, str) for c in contents):
+        return None
+    config_key = config.model_dump_json(exclude_none=True) if config is not None else ""
+    return hashlib.sha256("\x00".join([task, model, config_key, *contents]).encode()).hexdigest()
+
+def timed_generate(task, model, contents, config):
+    start = time.perf_counter()
+    try:
+        response = get_llm().generate(model=model, contents=contents, config=config)
+    except Exception:
+        LLM_CALLS.inc(task=task, outcome="error")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        LLM_CALL_SECONDS.observe(elapsed, task=task)
+        record_trace(f"llm_{task}", elapsed)
+    LLM_CALLS.inc(task=task, outcome="ok")
+    record_llm_usage(task, text_chars(contents), len(response.text), response.prompt_tokens, response.output_tokens)
+    return response
+
+def generate_content(task, model, contents, config=None):
+    """Single entry point for blocking model calls: governed, retried, coalesced and instrumented per task."""
+    return governor.call(task, lambda: timed_generate(task, model, contents, config),
+                         coalesce_key=coalesce_key_for(task, model, contents, config))
+
+def generate_content_stream(task, model, contents, config=None):
+    """
+    Streaming counterpart of generate_content. The slot is held until the stream ends; a
+    transient failure is retried only if no chunk has been forwarded yet.
+    """
+    for attempt in range(governor.max_retries + 1):
+        forwarded = False
+        start = time.perf_counter()
+        response_chars = prompt_tokens = output_tokens = 0
+        try:
+            with governor.slot(task):
+                try:
+                    for chunk in get_llm().generate_stream(model=model, contents=contents, config=config):
+                        response_chars += len(chunk.text)
+                        prompt_tokens = chunk.prompt_tokens or prompt_tokens
+                        output_tokens = chunk.output_tokens or output_tokens
+                        forwarded = True
+                        yield chunk
+                finally:
+                    LLM_CALL_SECONDS.observe(time.perf_counter() - start, task=task)
+        except Exception as e:
+            LLM_CALLS.inc(task=task, outcome="error")
+            if forwarded or attempt >= governor.max_retries or not is_retryable(e):
+                raise
+            governor.backoff(task, attempt)
+            continue
+        LLM_CALLS.inc(task=task, outcome="ok")
+        record_llm_usage(task, text_chars(contents), response_chars, prompt_tokens, output_tokens)
+        return
 
 # --- Directory Setup (Unchanged) ---
 UPLOAD_FOLDER = 'uploads/temp_resumes'
 SAVED_RESUMES_DIR = 'saved_data/resumes'
-METADATA_DB_FILE = 'saved_data/resumes_metadata.json'
+METADATA_DB_FILE = os.getenv('METADATA_DB_FILE', 'saved_data/resumes_metadata.db')
+LEGACY_METADATA_JSON_FILE = 'saved_data/resumes_metadata.json'
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(SAVED_RESUMES_DIR, exist_ok=True)
+# --- Object Storage ---
+# Temp uploads, batch spools and saved blobs are read and written through `storage`, so a confirm
+# or a batch item can land on a different worker or container than the request that uploaded the
+# file, without a shared upload directory. (The metadata DB is still a local SQLite file, so every
+# worker must run on the host that holds it; see Metadata Store.) Keys are the relative paths of the local layout (uploads/temp_resumes/<name>, uploads/batch_jobs/..., saved_data/blobs/...). STORAGE_BACKEND='local' (default) keeps
+# them in the working directory; 's3' keeps them in S3_BUCKET under S3_PREFIX on any S3-compatible
+# endpoint (S3_ENDPOINT_URL for MinIO, or a moto server in tests). Credentials come from the usual AWS env vars.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+S3_BUCKET = os.getenv('S3_BUCKET', '')
+S3_PREFIX = os.getenv('S3_PREFIX', '')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None
 
-if not os.path.exists(METADATA_DB_FILE) or os.stat(METADATA_DB_FILE).st_size == 0:
-    with open(METADATA_DB_FILE, 'w') as f:
-        json.dump([], f)
+class LocalObjectStore:
+    def __init__(self, root='.'):
+        self.root = root
 
-# --- Helper functions for metadata (Unchanged) ---
-def load_metadata():
-    if not os.path.exists(METADATA_DB_FILE) or os.stat(METADATA_DB_FILE).st_size == 0:
-        return []
-    with open(METADATA_DB_FILE, 'r') as f:
-        return json.load(f)
+    def local_path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def _replace_into(self, key, fill):
+        """Writes via a temp file and an atomic rename, so concurrent writers of one key are harmless."""
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            fill(tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_file(self, key, path, move=False):
+        if os.path.abspath(self.local_path(key)) == os.path.abspath(path):
+            return
+        self._replace_into(key, lambda tmp_path: (shutil.move if move else shutil.copyfile)(path, tmp_path))
+
+    def put_bytes(self, key, data):
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        self._replace_into(key, write)
+
+    def open(self, key):
+        return open(self.local_path(key), 'rb')
+
+    def read_bytes(self, key):
+        with self.open(key) as f:
+            return f.read()
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    def move(self, source_key, key):
+        self._replace_into(key, lambda tmp_path: os.replace(self.local_path(source_key), tmp_path))
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix):
+        """Yields (key, size, modified_timestamp) for every object under prefix."""
+        for dirpath, _, filenames in os.walk(self.local_path(prefix)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Removed while walking
+                yield os.path.relpath(path, self.root).replace(os.sep, '/'), stat.st_size, stat.st_mtime
+
+    def delete_prefix(self, prefix):
+        path = self.local_path(prefix)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path, exist_ok=True)
+
+    def ping(self):
+        return os.access(self.root, os.W_OK)
+
+class S3ObjectStore:
+    def __init__(self, bucket, prefix='', endpoint_url=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def client(self):
+        # Like the model client, one boto3 client per process: they must not cross a fork
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = boto3.session.Session().client("s3", endpoint_url=self.endpoint_url)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def local_path(self, key):
+        return None
+
+    def put_file(self, key, path, move=False):
+        self.client.upload_file(path, self.bucket, self._key(key))
+        if move:
+            os.remove(path)
+
+    def put_bytes(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def open(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key) from None
+
+    def read_bytes(self, key):
+        with self.open(key) as body:
+            return body.read()
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def move(self, source_key, key):
+        self.client.copy_object(Bucket=self.bucket, Key=self._key(key), CopySource={"Bucket": self.bucket, "Key": self._key(source_key)})
+        self.delete(source_key)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
 
-def save_metadata(metadata):
-    with open(METADATA_DB_FILE, 'w') as f:
-        json.dump(metadata, f, indent=4)
+    def list(self, prefix):
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.prefix):], obj["Size"], obj["LastModified"].timestamp()
+
+    def delete_prefix(self, prefix):
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if keys:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys, "Quiet": True})
+
+    def ping(self):
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+            return True
+        except Exception:
+            return False
+
+def make_object_store(backend):
+    if backend == 's3':
+        if not S3_BUCKET:
+            raise ValueError("S3_BUCKET environment variable not set!")
+        return S3ObjectStore(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL)
+    return LocalObjectStore()
+
+storage = make_object_store(STORAGE_BACKEND)
+
+def temp_upload_key(filename):
+    return f"{UPLOAD_FOLDER}/{secure_filename(filename)}"
+
+@contextmanager
+def local_copy(key):
+    """Yields a filesystem path for key, downloading it to a temp file first when the store is remote."""
+    path = storage.local_path(key)
+    if path is not None:
+        yield path
+        return
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+    try:
+        with os.fdopen(fd, 'wb') as out, storage.open(key) as body:
+            shutil.copyfileobj(body, out)
+        yield path
+    finally:
+        os.remove(path)
+
+# --- Upload Intake ---
+# Uploads are copied off the request in chunks under a byte cap and hashed on the way, then
+# checked structurally (header, encryption, page count) before any rendering or model call.
+# Unconfirmed temp uploads are removed by a background reaper after TEMP_UPLOAD_TTL_SECONDS,
+# oldest first whenever they exceed TEMP_UPLOAD_QUOTA_BYTES.
+# Request bodies are capped per route so Werkzeug rejects oversized ones before buffering them:
+# MAX_REQUEST_BYTES for JSON endpoints, MAX_UPLOAD_BYTES (+ multipart framing) for /parse_resume,
+# and the large MAX_BATCH_REQUEST_BYTES only for /batch_jobs.
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+MAX_REQUEST_BYTES = int(os.getenv('MAX_REQUEST_BYTES', 2 * 1024 * 1024))
+MAX_BATCH_REQUEST_BYTES = int(os.getenv('MAX_BATCH_REQUEST_BYTES', 256 * 1024 * 1024))
+MAX_PDF_PAGES = int(os.getenv('MAX_PDF_PAGES', 20))
+UPLOAD_CHUNK_BYTES = 256 * 1024
+TEMP_UPLOAD_TTL_SECONDS = int(os.getenv('TEMP_UPLOAD_TTL_SECONDS', 6 * 3600))
+TEMP_UPLOAD_QUOTA_BYTES = int(os.getenv('TEMP_UPLOAD_QUOTA_BYTES', 1024 * 1024 * 1024))
+TEMP_REAPER_INTERVAL = float(os.getenv('TEMP_REAPER_INTERVAL', 300))
+
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES  # Default; upload routes raise it via request.max_content_length
+
+def format_bytes(n):
+    return f"{n / (1024 * 1024):.0f} MB" if n >= 1024 * 1024 else f"{n / 1024:.0f} KB"
+
+class UploadRejected(ValueError):
+    def __init__(self, message, status=400, reason="invalid"):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+def spool_upload(stream, dest_path, max_bytes=MAX_UPLOAD_BYTES, require_pdf_header=True):
+    """Copies an upload stream to dest_path, hashing as it goes; returns (sha256, size). Stops as soon as max_bytes is passed."""
+    digest, size = hashlib.sha256(), 0
+    try:
+        with open(dest_path, 'wb') as out:
+            while chunk := stream.read(UPLOAD_CHUNK_BYTES):
+                if size == 0 and require_pdf_header and b"%PDF-" not in chunk[:1024]:
+                    raise UploadRejected("Only PDF files are supported.", 415, "not_pdf")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f"File exceeds the {format_bytes(max_bytes)} upload limit.", 413, "too_large")
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadRejected("The uploaded file is empty.", 400, "empty")
+    except Exception:
+        if os.path.exists(dest_path): os.remove(dest_path)
+        raise
+    return digest.hexdigest(), size
+
+def validate_pdf(path):
+    """Opens the PDF without rendering anything and rejects ones we cannot or should not parse."""
+    try:
+        doc = fitz.open(path)
+    except Exception:
+        # PyMuPDF's message names the server-side spool path, so it stays out of the response
+        raise UploadRejected("Could not read the PDF; the file may be corrupt.", 422, "corrupt")
+    with doc:
+        if not doc.is_pdf:
+            raise UploadRejected("Only PDF files are supported.", 415, "not_pdf")
+        if doc.needs_pass:
+            raise UploadRejected("Password-protected PDFs are not supported.", 422, "encrypted")
+        if doc.page_count == 0:
+            raise UploadRejected("The PDF has no pages.", 422, "empty")
+        if doc.page_count > MAX_PDF_PAGES:
+            raise UploadRejected(f"The PDF has {doc.page_count} pages; at most {MAX_PDF_PAGES} are supported.", 422, "too_many_pages")
+
+def reap_temp_uploads(store, now=None):
+    """One reaper pass over store's temp uploads; returns the number of files deleted."""
+    now = now or time.time()
+    kept, reaped = [], 0
+    for key, size, modified in sorted(store.list(UPLOAD_FOLDER), key=lambda entry: entry[2]):
+        if now - modified > TEMP_UPLOAD_TTL_SECONDS:
+            store.delete(key)
+            TEMP_UPLOADS_REAPED.inc(reason="ttl")
+            reaped += 1
+        else:
+            kept.append((key, size))
+    total = sum(size for _, size in kept)
+    for key, size in kept:  # Oldest first
+        if total <= TEMP_UPLOAD_QUOTA_BYTES:
+            break
+        store.delete(key)
+        TEMP_UPLOADS_REAPED.inc(reason="quota")
+        total -= size
+        reaped += 1
+    TEMP_UPLOAD_BYTES.set(total)
+    return reaped
+
+def temp_upload_reaper():
+    """Long-running greenlet; also sweeps the local spool when temp uploads are published to a remote store."""
+    stores = [storage] if storage.local_path(UPLOAD_FOLDER) else [storage, LocalObjectStore()]
+    while True:
+        for store in stores:
+            try:
+                reap_temp_uploads(store)
+            except Exception as e:
+                print(f"Error reaping temp uploads: {e}")
+        gevent.sleep(TEMP_REAPER_INTERVAL)
+
+# --- Metadata Store (SQLite) ---
+# Each confirmation is a single-row insert, so concurrent greenlets/workers no longer lose writes,
+# and filtering/sorting/pagination of saved resumes happens on indexed columns. The same DB holds the
+# artifact, batch and ranking tables.
+# METADATA_DB_FILE must be on a local disk of the one host running every worker. Multi-host
+# deployments still need a single metadata host: SQLite's locking is unreliable on network
+# filesystems (NFS/SMB), so do not share the file between hosts.
+METADATA_SORT_COLUMNS = {
+    "timestamp": "timestamp",
+    "person_name": "person_name COLLATE NOCASE",
+    "fit_score": "fit_score_value",
+}
+METADATA_FIELDS = ["id", "person_name", "jd_role", "fit_score", "fit_score_value", "resume_filename", "qa_filename", "timestamp"]
+
+def metadata_db(busy_timeout=30):
+    conn = sqlite3.connect(METADATA_DB_FILE, timeout=busy_timeout)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+    return conn
+
+def parse_fit_score_value(fit_score_text):
+    """Pulls the numeric score out of a fit score report (e.g. "Score: 7.5/10" -> 7.5)."""
+    match = re.search(r'(\d+(\.\d+)?)', fit_score_text or '')
+    return float(match.group(1)) if match else 0.0
+
+def init_metadata_store():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS resumes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                person_name TEXT NOT NULL DEFAULT '',
+                jd_role TEXT NOT NULL DEFAULT '',
+                fit_score TEXT NOT NULL DEFAULT '',
+                fit_score_value REAL NOT NULL DEFAULT 0,
+                resume_filename TEXT NOT NULL,
+                qa_filename TEXT NOT NULL,
+                timestamp TEXT NOT NULL DEFAULT ''
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_resumes_role ON resumes (jd_role)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_resumes_timestamp ON resumes (timestamp, seq)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_resumes_person_name ON resumes (person_name COLLATE NOCASE, seq)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_resumes_fit_score ON resumes (fit_score_value, seq)")
+    migrate_legacy_metadata()
+
+def migrate_legacy_metadata():
+    """One-shot import of the old resumes_metadata.json; the file is renamed once imported."""
+    if not os.path.exists(LEGACY_METADATA_JSON_FILE):
+        return
+    try:
+        with open(LEGACY_METADATA_JSON_FILE, 'r') as f:
+            legacy_entries = json.load(f) if os.stat(LEGACY_METADATA_JSON_FILE).st_size else []
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error reading legacy metadata file: {e}")
+        return
+    for entry in legacy_entries:
+        insert_metadata(entry, ignore_existing=True)
+    try:
+        os.replace(LEGACY_METADATA_JSON_FILE, f"{LEGACY_METADATA_JSON_FILE}.migrated")
+    except OSError:
+        pass  # Another worker already finished the migration
+
+def insert_metadata(entry, ignore_existing=False):
+    row = {
+        "id": entry["id"], "person_name": entry.get("person_name") or "", "jd_role": entry.get("jd_role") or "",
+        "fit_score": entry.get("fit_score") or "", "fit_score_value": parse_fit_score_value(entry.get("fit_score")),
+        "resume_filename": entry["resume_filename"], "qa_filename": entry["qa_filename"], "timestamp": entry.get("timestamp") or "",
+    }
+    verb = "INSERT OR IGNORE" if ignore_existing else "INSERT"
+    with closing(metadata_db()) as conn, conn:
+        conn.execute(f"{verb} INTO resumes ({', '.join(METADATA_FIELDS)}) VALUES ({', '.join(':' + k for k in METADATA_FIELDS)})", row)
+
+def encode_cursor(sort_value, seq):
+    return base64.urlsafe_b64encode(json.dumps([sort_value, seq]).encode()).decode()
+
+def decode_cursor(cursor):
+    sort_value, seq = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return sort_value, int(seq)
+
+def query_metadata(role=None, sort_key='timestamp', sort_order='desc', limit=None, cursor=None):
+    """
+    Returns (entries, next_cursor). Pagination is keyset-based on (sort column, seq),
+    so each page is an index range scan regardless of how deep the cursor is.
+    """
+    if sort_key not in METADATA_SORT_COLUMNS: sort_key = 'timestamp'
+    sort_column = METADATA_SORT_COLUMNS[sort_key]
+    cursor_field = "fit_score_value" if sort_key == 'fit_score' else sort_key
+    descending = sort_order == 'desc'
+    direction = "DESC" if descending else "ASC"
+    where, params = [], []
+    if role and role != 'All Roles':
+        where.append("jd_role = ?")
+        params.append(role)
+    if cursor:
+        cursor_value, cursor_seq = decode_cursor(cursor)
+        op = "<" if descending else ">"
+        where.append(f"({sort_column} {op} ? OR ({sort_column} = ? AND seq {op} ?))")
+        params.extend([cursor_value, cursor_value, cursor_seq])
+    sql = f"SELECT seq, {', '.join(METADATA_FIELDS)} FROM resumes"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {sort_column} {direction}, seq {direction}"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    with closing(metadata_db()) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[cursor_field], last["seq"])
+    entries = [{k: row[k] for k in METADATA_FIELDS if k != "fit_score_value"} for row in rows]
+    return entries, next_cursor
+
+def clear_metadata():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("DELETE FROM resumes")
+
+# --- Blob Store (content-addressed) ---
+# Saved resumes and Q&A files are stored (in `storage`) once per distinct content under
+# BLOB_DIR/<sha[:2]>/<sha[2:4]>/<sha>[.gz]; the `artifacts` table maps each public filename
+# (the resume_filename / qa_filename in the metadata) to its blob. Text artifacts are gzipped.
+BLOB_DIR = 'saved_data/blobs'
+BLOB_CACHE_MAX_AGE = int(os.getenv('BLOB_CACHE_MAX_AGE', 3600))
+
+def init_blob_store():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                name TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                encoding TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                content_type TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_sha ON artifacts (sha256)")
+
+def blob_key(sha, encoding):
+    return f"{BLOB_DIR}/{sha[:2]}/{sha[2:4]}/{sha}{'.gz' if encoding == 'gzip' else ''}"
+
+def record_artifact(name, sha, encoding, size, content_type):
+    with closing(metadata_db()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO artifacts (name, sha256, encoding, size, content_type, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (name, sha, encoding, size, content_type, time.time()))
+
+def store_artifact_file(name, source_key, content_type):
+    """Stores an object (consuming source_key) as-is; PDFs are already compressed internally."""
+    digest, size = hashlib.sha256(), 0
+    with storage.open(source_key) as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    sha = digest.hexdigest()
+    if storage.exists(blob_key(sha, "identity")):
+        BLOB_DEDUPED.inc(kind="file")
+        storage.delete(source_key)
+    else:
+        storage.move(source_key, blob_key(sha, "identity"))
+    record_artifact(name, sha, "identity", size, content_type)
+    return sha
+
+def store_artifact_text(name, text, content_type="text/markdown; charset=utf-8"):
+    data = text.encode('utf-8')
+    sha = hashlib.sha256(data).hexdigest()
+    if storage.exists(blob_key(sha, "gzip")):
+        BLOB_DEDUPED.inc(kind="text")
+    else:
+        storage.put_bytes(blob_key(sha, "gzip"), gzip.compress(data, mtime=0))
+    record_artifact(name, sha, "gzip", len(data), content_type)
+    return sha
+
+def lookup_artifact(name):
+    with closing(metadata_db()) as conn:
+        row = conn.execute("SELECT * FROM artifacts WHERE name = ?", (name,)).fetchone()
+    return dict(row) if row else None
+
+def open_artifact(name):
+    """Binary file object with the decoded content of a stored artifact (or a legacy flat file), or None."""
+    artifact = lookup_artifact(name)
+    if artifact is not None:
+        body = storage.open(blob_key(artifact["sha256"], artifact["encoding"]))
+        return gzip.GzipFile(fileobj=body, mode='rb') if artifact["encoding"] == "gzip" else body
+    legacy_path = os.path.join(SAVED_RESUMES_DIR, name)
+    return open(legacy_path, 'rb') if os.path.exists(legacy_path) else None
+
+def artifact_response(name, as_attachment=False):
+    """
+    Serves a stored artifact with ETag/Last-Modified, conditional GET and Range support,
+    or returns None if there is no such artifact. Gzipped blobs go out as-is to clients
+    that accept gzip and are decompressed for the rest.
+    """
+    artifact = lookup_artifact(name)
+    if artifact is None:
+        return None
+    sha, encoding = artifact["sha256"], artifact["encoding"]
+    key = blob_key(sha, encoding)
+    last_modified = datetime.fromtimestamp(artifact["created_at"], timezone.utc)
+    local_path = storage.local_path(key)
+    if encoding == "identity" and local_path:
+        # Stored content types may already carry a charset; `mimetype=` would append a second one.
+        response = send_file(os.path.abspath(local_path), mimetype=artifact["content_type"].split(";")[0], as_attachment=as_attachment,
+                             download_name=name, etag=sha, last_modified=last_modified, max_age=BLOB_CACHE_MAX_AGE, conditional=True)
+        response.content_type = artifact["content_type"]
+        return response
+    send_gzip = encoding == "gzip" and request.accept_encodings["gzip"]
+    etag = f"{sha}-gzip" if send_gzip else sha
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)  # Answered without fetching the blob
+    elif encoding == "identity":
+        response = Response(wrap_file(request.environ, storage.open(key)), content_type=artifact["content_type"], direct_passthrough=True)
+        length = artifact["size"]
+    else:
+        body = storage.read_bytes(key)
+        if not send_gzip:
+            body = gzip.decompress(body)
+        response = Response(body, content_type=artifact["content_type"])
+        if send_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        length = len(body)
+    response.set_etag(etag)
+    if encoding == "gzip":
+        response.vary.add("Accept-Encoding")
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.max_age = BLOB_CACHE_MAX_AGE
+    if as_attachment:
+        response.headers["Content-Disposition"] = f'attachment; filename="{name}"'
+    if response.status_code == 304:
+        return response
+    return response.make_conditional(request, accept_ranges=True, complete_length=length)
+
+def clear_blob_store():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("DELETE FROM artifacts")
+    storage.delete_prefix(BLOB_DIR)
+
+def save_confirmed_resume(temp_upload_key, original_file_name, person_name, jd_role, fit_score, qa_text, timestamp, resume_json=None):
+    """Moves a parsed upload into the saved store, writes its Q&A file, records the metadata row and indexes the parsed resume."""
+    if not storage.exists(temp_upload_key):
+        raise FileNotFoundError(temp_upload_key)
+    entry_id = str(uuid.uuid4())
+    filename_base, file_ext = os.path.splitext(original_file_name)
+    saved_resume_filename_unique = f"{entry_id}_{secure_filename(filename_base)}{file_ext}"
+    saved_qa_filename = f"{entry_id}_qa.md"
+    with stage_timer("confirm_file_move"):
+        store_artifact_file(saved_resume_filename_unique, temp_upload_key, "application/pdf")
+
+    with stage_timer("qa_write"):
+        store_artifact_text(saved_qa_filename, qa_text or "")
+
+    with stage_timer("metadata_write"):
+        insert_metadata({
+            "id": entry_id, "person_name": person_name, "jd_role": jd_role,
+            "fit_score": fit_score, "resume_filename": saved_resume_filename_unique,
+            "qa_filename": saved_qa_filename, "timestamp": timestamp
+        })
+    if resume_json:
+        with stage_timer("rank_index_update"):
+            index_resume(entry_id, resume_json)
+    return entry_id
+
+# --- Parse Cache (keyed by PDF content hash) ---
+# Bump PARSE_CACHE_VERSION whenever the parse prompt or model changes so stale entries are ignored.
+PARSE_MODEL = "gemini-2.0-flash"
+PARSE_CACHE_VERSION = f"{PARSE_MODEL}:parse-v5:{os.getenv('PARSE_MODE', 'auto')}"
+PARSE_CACHE_DIR = 'saved_data/parse_cache'
+PARSE_CACHE_MEMORY_ITEMS = int(os.getenv('PARSE_CACHE_MEMORY_ITEMS', 256))
+PARSE_CACHE_MAX_BYTES = int(os.getenv('PARSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ParseCache:
+    """
+    Two-tier cache for parse results: an in-process LRU in front of a
+    size-bounded directory of JSON files that survives worker restarts.
+    """
+    def __init__(self, directory, version, memory_items, max_disk_bytes):
+        self.directory = directory
+        self.version = version
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def key_for(self, content_sha256):
+        return hashlib.sha256(f"{self.version}:{content_sha256}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, content_sha256):
+        key = self.key_for(content_sha256)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return dict(self._memory[key])
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)  # Mark as recently used for disk eviction
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        self._remember(key, value)
+        with self._lock:
+            self.stats["disk_hits"] += 1
+        return dict(value)
+
+    def put(self, content_sha256, value):
+        key = self.key_for(content_sha256)
+        self._remember(key, dict(value))
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing parse cache entry: {e}")
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            return
+        with self._lock:
+            self.stats["stores"] += 1
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'): continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        if total <= self.max_disk_bytes: return
+        for _, size, name in sorted(entries):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats["evictions"] += 1
+            if total <= self.max_disk_bytes: break
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["version"] = self.version
+        return stats
+
+parse_cache = ParseCache(PARSE_CACHE_DIR, PARSE_CACHE_VERSION, PARSE_CACHE_MEMORY_ITEMS, PARSE_CACHE_MAX_BYTES)
+
+# --- LLM Response Cache ---
+# The analysis functions are pure functions of (prompt version, model, inputs), so repeat clicks
+# and tab switches are answered from cache. LLM_CACHE_BACKEND: 'memory' (per worker),
+# 'sqlite' (shared by all workers on the host) or 'none'.
+ANALYSIS_MODEL = "gemini-2.0-flash"
+LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'memory')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+LLM_CACHE_DB_FILE = 'saved_data/llm_cache.db'
+
+class MemoryResponseCache:
+    """Per-process LRU bounded by the total size of the cached strings, with per-entry TTL."""
+    def __init__(self, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries: self._drop(key)
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+class SQLiteResponseCache:
+    """Host-wide cache shared by all gunicorn workers; least recently used rows are evicted past max_bytes."""
+    EVICT_EVERY = 32
+
+    def __init__(self, db_file, ttl, max_bytes):
+        self.db_file = db_file
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._puts = 0
+
+    def init_schema(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL, last_access REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value FROM responses WHERE key = ? AND expires_at >= ?", (key, now)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                         (key, value, len(value), now + self.ttl, now))
+            self._puts += 1
+            if self._puts % self.EVICT_EVERY == 0:
+                self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess: break
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM responses")
+
+def make_response_cache(backend):
+    if backend == 'sqlite':
+        return SQLiteResponseCache(LLM_CACHE_DB_FILE, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+    if backend == 'memory':
+        return MemoryResponseCache(LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+    return None
+
+response_cache = make_response_cache(LLM_CACHE_BACKEND)
+response_cache_stats = {}
+response_cache_stats_lock = threading.Lock()
+
+def normalized_hash(value):
+    """Whitespace-insensitive hash so re-sent text with different line endings/indentation still hits."""
+    return hashlib.sha256(" ".join(str(value or "").split()).encode()).hexdigest()
+
+def record_cache_event(name, event):
+    with response_cache_stats_lock:
+        stats = response_cache_stats.setdefault(name, {"hits": 0, "misses": 0, "stores": 0})
+        stats[event] += 1
+
+def response_cache_key(name, version, args):
+    return hashlib.sha256(":".join([name, version, ANALYSIS_MODEL, *map(normalized_hash, args)]).encode()).hexdigest()
+
+def llm_cached(name, version, cacheable=lambda result: bool(result)):
+    """Memoizes an LLM-backed function on (name, prompt version, model, normalized input hashes)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            if response_cache is None or not all(args):
+                return fn(*args)  # Missing inputs only produce the guard message
+            key = response_cache_key(name, version, args)
+            try:
+                cached = response_cache.get(key)
+            except sqlite3.Error as e:
+                print(f"Error reading LLM response cache: {e}")
+                cached = None
+            if cached is not None:
+                record_cache_event(name, "hits")
+                return cached
+            record_cache_event(name, "misses")
+            result = fn(*args)
+            if isinstance(result, str) and cacheable(result):
+                try:
+                    response_cache.put(key, result)
+                    record_cache_event(name, "stores")
+                except sqlite3.Error as e:
+                    print(f"Error writing LLM response cache: {e}")
+            return result
+        wrapper.cache_name, wrapper.cache_version = name, version
+        return wrapper
+    return decorator
+
+def response_cache_snapshot():
+    with response_cache_stats_lock:
+        functions = {name: dict(stats) for name, stats in response_cache_stats.items()}
+    for stats in functions.values():
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return {"backend": LLM_CACHE_BACKEND, "ttl_seconds": LLM_CACHE_TTL, "max_bytes": LLM_CACHE_MAX_BYTES, "functions": functions}
 
 # --- LLM Interaction Functions ---
-def pdf_to_image(pdf_file_path):
-    doc = fitz.open(pdf_file_path)
-    first_page = doc[0]
-    # --- CHANGE 4: DPI REDUCED FOR MEMORY EFFICIENCY ---
-    pix = first_page.get_pixmap(dpi=150)
-    img_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}_resume_img.png")
-    pix.save(img_path)
-    doc.close()
-    return img_path
+# Pages are rendered straight from the PyMuPDF pixmap into PIL images (no temp PNG round trip).
+# Every page is rendered; DPI is lowered for long documents so the total rendered pixels stay
+# within RENDER_PIXEL_BUDGET (down to RENDER_MIN_DPI, with page count bounded by MAX_PDF_PAGES at upload).
+RENDER_MAX_DPI = int(os.getenv('RENDER_MAX_DPI', 150))
+RENDER_MIN_DPI = int(os.getenv('RENDER_MIN_DPI', 72))
+RENDER_PIXEL_BUDGET = int(os.getenv('RENDER_PIXEL_BUDGET', 8_000_000))
+
+def render_dpi_for(pages):
+    """Picks the highest DPI (capped at RENDER_MAX_DPI) that keeps all pages within the pixel budget."""
+    total_sq_inches = sum((page.rect.width / 72) * (page.rect.height / 72) for page in pages)
+    if not total_sq_inches:
+        return RENDER_MAX_DPI
+    dpi = int((RENDER_PIXEL_BUDGET / total_sq_inches) ** 0.5)
+    return max(RENDER_MIN_DPI, min(RENDER_MAX_DPI, dpi))
+
+def pdf_to_images(pdf_file_path):
+    """Renders every page of the PDF as in-memory RGB images."""
+    with fitz.open(pdf_file_path) as doc:
+        pages = list(doc)
+        dpi = render_dpi_for(pages)
+        images = []
+        for page in pages:
+            pix = page.get_pixmap(dpi=dpi, alpha=False)
+            images.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+            pix = None  # Release the pixmap buffer before rendering the next page
+        return images
+
+# --- Structured Resume Output ---
+# Parsing asks the model for JSON matching RESUME_RESPONSE_SCHEMA and validates it into
+# ResumeRecord. Near-miss output (code fences, trailing commas, smart quotes, truncation)
+# is repaired locally, so the table view never needs a second model call.
+@functools.cache
+def resume_record_model():
+    """
+    Builds the ResumeRecord model on first use; importing pydantic and building the validators
+    is a noticeable share of boot time. pydantic's ValidationError subclasses ValueError, so
+    callers only need to catch ValueError.
+    """
+    from pydantic import BaseModel, BeforeValidator, ConfigDict, field_validator
+
+    LooseStr = Annotated[str, BeforeValidator(lambda v: "" if v is None else v)]
+    LooseStrList = Annotated[list[str], BeforeValidator(lambda v: [] if v is None else [v] if isinstance(v, str) else v)]
+
+    class ResumeModel(BaseModel):
+        model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    class EducationRecord(ResumeModel):
+        degree: LooseStr = ""
+        institution: LooseStr = ""
+        years: LooseStr = ""
+        location: LooseStr = ""
+
+    class ExperienceRecord(ResumeModel):
+        title: LooseStr = ""
+        company: LooseStr = ""
+        dates: LooseStr = ""
+        responsibilities: LooseStrList = []
+
+    class ProjectRecord(ResumeModel):
+        name: LooseStr = ""
+        technologies: LooseStrList = []
+        outcomes: LooseStrList = []
+
+    class ResumeRecord(ResumeModel):
+        name: LooseStr = ""
+        email: LooseStr = ""
+        phone: LooseStr = ""
+        education: list[EducationRecord] = []
+        skills: dict[str, LooseStrList] = {}
+        experience: list[ExperienceRecord] = []
+        projects: list[ProjectRecord] = []
+
+        @field_validator("education", "experience", "projects", mode="before")
+        @classmethod
+        def _list_or_empty(cls, value):
+            return [] if value is None else [value] if isinstance(value, dict) else value
+
+        @field_validator("skills", mode="before")
+        @classmethod
+        def _skills_by_category(cls, value):
+            """The response schema returns [{"category", "items"}]; stored records keep {category: [items]}."""
+            if value is None:
+                return {}
+            if isinstance(value, str):
+                return {"Skills": [value]}
+            if isinstance(value, list):
+                if all(isinstance(group, dict) and "items" in group for group in value):
+                    return {group.get("category") or "Skills": group["items"] for group in value}
+                return {"Skills": value}
+            return value
+
+    return ResumeRecord
+
+def _string_schema():
+    return {"type": "STRING"}
+
+def _number_schema():
+    return {"type": "NUMBER"}
+
+def _string_list_schema():
+    return {"type": "ARRAY", "items": _string_schema()}
+
+def _object_schema(**properties):
+    return {"type": "OBJECT", "properties": properties, "required": list(properties), "property_ordering": list(properties)}
+
+# Gemini's response schema cannot express free-form keys, so skills are requested as category groups.
+RESUME_RESPONSE_SCHEMA = _object_schema(
+    name=_string_schema(), email=_string_schema(), phone=_string_schema(),
+    education={"type": "ARRAY", "items": _object_schema(degree=_string_schema(), institution=_string_schema(), years=_string_schema(), location=_string_schema())},
+    skills={"type": "ARRAY", "items": _object_schema(category=_string_schema(), items=_string_list_schema())},
+    experience={"type": "ARRAY", "items": _object_schema(title=_string_schema(), company=_string_schema(), dates=_string_schema(), responsibilities=_string_list_schema())},
+    projects={"type": "ARRAY", "items": _object_schema(name=_string_schema(), technologies=_string_list_schema(), outcomes=_string_list_schema())},
+)
+@functools.cache
+def resume_parse_config():
+    return genai_types.GenerateContentConfig(response_mime_type="application/json", response_schema=RESUME_RESPONSE_SCHEMA)
+
+def close_truncated_json(text):
+    """Appends the quotes/brackets a truncated JSON document is missing."""
+    stack, in_string, escaped = [], False, False
+    for ch in text:
+        if in_string:
+            if escaped: escaped = False
+            elif ch == '\\': escaped = True
+            elif ch == '"': in_string = False
+        elif ch == '"': in_string = True
+        elif ch in '{[': stack.append('}' if ch == '{' else ']')
+        elif ch in '}]' and stack: stack.pop()
+    if in_string:
+        text += '"'
+    text = re.sub(r'[,:]\s*$', '', text.rstrip())
+    return text + "".join(reversed(stack))
+
+def repair_json(text):
+    """json.loads with local fixes for common model near-misses; raises ValueError if nothing parses."""
+    text = str(text or "").strip()
+    fenced = re.search(r'```(?:json)?\s*\n?([\s\S]*?)(?:\n?```|$)', text)
+    candidates = [text]
+    if fenced: candidates.append(fenced.group(1).strip())
+    if '{' in text: candidates.append(text[text.index('{'):text.rindex('}') + 1] if '}' in text else text[text.index('{'):])
+    for candidate in candidates:
+        fixed = candidate.replace('\u201c', '"').replace('\u201d', '"').replace('\u2018', "'").replace('\u2019', "'")
+        fixed = re.sub(r',\s*([}\]])', r'\1', fixed)
+        for attempt in (candidate, fixed, close_truncated_json(fixed)):
+            try:
+                return json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+    raise ValueError("No valid JSON object found in model output")
+
+def parse_resume_record(raw_llm_output):
+    """Repairs and validates model output into a ResumeRecord (raises ValueError)."""
+    data = repair_json(raw_llm_output)
+    if not isinstance(data, dict):
+        raise ValueError("Model output is not a JSON object")
+    return resume_record_model().model_validate(data)
+
+# --- Text-Layer Fast Path ---
+# Word/LaTeX exports carry a usable text layer, so they are parsed from compact text instead of page images.
+# PARSE_MODE='vision' forces the image path for every document.
+PARSE_MODE = os.getenv('PARSE_MODE', 'auto')
+TEXT_LAYER_MIN_CHARS = int(os.getenv('TEXT_LAYER_MIN_CHARS', 200))
+TEXT_LAYER_MAX_CHARS = int(os.getenv('TEXT_LAYER_MAX_CHARS', 40_000))
+
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+PHONE_RE = re.compile(r'\+?\(?\d[\d\s().-]{7,}\d')
+
+def extract_text_layer(pdf_file_path):
+    """Returns the PDF's text blocks in reading order with runs of whitespace collapsed."""
+    blocks = []
+    with fitz.open(pdf_file_path) as doc:
+        for page in doc:
+            for block in page.get_text("blocks", sort=True):
+                if block[6] != 0: continue  # Skip image blocks
+                lines = (" ".join(line.split()) for line in block[4].splitlines())
+                text = "\n".join(line for line in lines if line)
+                if text: blocks.append(text)
+    return "\n".join(blocks)[:TEXT_LAYER_MAX_CHARS]
+
+def text_layer_is_usable(text):
+    """Scanned PDFs have no text layer; broken font encodings show up as replacement/control characters."""
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < TEXT_LAYER_MIN_CHARS:
+        return False
+    garbled = sum(1 for c in visible if c == '\ufffd' or not c.isprintable())
+    return garbled / len(visible) < 0.02
+
+def extract_contact_fields(text):
+    """Deterministic name/email/phone extraction from the text layer."""
+    email_match = EMAIL_RE.search(text)
+    phone_match = next((m for m in PHONE_RE.finditer(text) if 10 <= sum(c.isdigit() for c in m.group()) <= 15), None)
+    name = ""
+    for line in text.splitlines()[:5]:
+        words = line.split()
+        if 2 <= len(words) <= 4 and all(w.replace('.', '').replace('-', '').replace("'", '').isalpha() for w in words):
+            name = " ".join(words)
+            break
+    return {"name": name, "email": email_match.group() if email_match else "", "phone": phone_match.group().strip() if phone_match else ""}
 
 def parse_resume_content(pdf_file_path):
     """
-    Parses a resume PDF using the Gemini Vision model.
+    Parses a resume PDF using the Gemini model, from its text layer when usable
+    and from rendered page images otherwise.
     Accepts the path to the PDF file.
     Returns parsed JSON string, raw text, and an extracted name.
     """
-    image_path = None
     try:
-        image_path = pdf_to_image(pdf_file_path)
-        image = Image.open(image_path).convert("RGB")
+        with stage_timer("text_extract"):
+            text_layer = extract_text_layer(pdf_file_path) if PARSE_MODE != 'vision' else ""
+        if text_layer_is_usable(text_layer):
+            parse_source = "text"
+            resume_inputs = [f"Resume text (extracted from the PDF text layer, in reading order):\n{text_layer}"]
+        else:
+            parse_source = "vision"
+            with stage_timer("render"):
+                resume_inputs = pdf_to_images(pdf_file_path)
         # Your original, detailed prompt is preserved
         prompt = """
-        You are an AI resume parser. Extract the following information from the resume:
+        You are an AI resume parser. The resume is given either as its extracted text or as page images in page order; treat it as one document.
+        Extract the following information from the resume:
         1.  **Name**: The full name of the candidate.
         2.  **Email**: The candidate's email address.
         3.  **Phone Number**: The candidate's phone number.
@@ -102,34 +1633,57 @@ def parse_resume_content(pdf_file_path):
           "projects": [{"name": "Portfolio Website", "technologies": ["React", "Node.js"], "outcomes": ["Showcased projects", "Improved personal branding"]}]
         }
         """
-        response = client.models.generate_content(
-           model="gemini-2.0-flash",
-           contents=[prompt, image]
+        response = generate_content(
+           "parse_resume",
+           model=PARSE_MODEL,
+           contents=[prompt, *resume_inputs],
+           config=resume_parse_config()
        )
         raw_llm_output = response.text
         parsed_json = {}
         extracted_name = "Unknown Person"
         try:
-            json_match = re.search(r'```json\n([\s\S]*?)\n```', raw_llm_output, re.DOTALL)
-            json_str = json_match.group(1) if json_match else raw_llm_output
-            parsed_json = json.loads(json_str)
-            extracted_name = parsed_json.get("name", "Unknown Person")
-            display_output = f"```json\n{json.dumps(parsed_json, indent=2)}\n```"
-        except json.JSONDecodeError as e:
+            with stage_timer("json_extract"):
+                parsed_json = parse_resume_record(raw_llm_output).model_dump()
+                if parse_source == "text":
+                    # Fill contact fields the model missed from the deterministic extractor
+                    for field, value in extract_contact_fields(text_layer).items():
+                        if value and not parsed_json.get(field): parsed_json[field] = value
+                extracted_name = parsed_json.get("name", "Unknown Person")
+                display_output = f"```json\n{json.dumps(parsed_json, indent=2)}\n```"
+        except ValueError as e:
             display_output = f"```plain\nError parsing LLM JSON output: {e}\nRaw LLM Output:\n{raw_llm_output}\n```"
             parsed_json = {"raw_text_fallback": raw_llm_output}
             extracted_name = "Unknown Person (Parsing Error)"
-        return { "display_output": display_output, "raw_parsed_text": json.dumps(parsed_json), "extracted_name": extracted_name }
+        return { "display_output": display_output, "raw_parsed_text": json.dumps(parsed_json), "extracted_name": extracted_name, "parse_source": parse_source }
     except Exception as e:
         return { "display_output": f"```plain\nError during resume parsing process: {e}\n```", "raw_parsed_text": json.dumps({"error": str(e)}), "extracted_name": "Error" }
-    finally:
-        if image_path and os.path.exists(image_path):
-            os.remove(image_path)
 
-def resume_check_content(resume_text):
-    """Performs a smart check on the resume text for common issues."""
-    if not resume_text:
-        return "Please parse a resume first."
+def is_successful_parse(parsed_data):
+    """False for hard errors and near misses (unrepairable output kept as raw_text_fallback), so a re-upload retries them."""
+    if parsed_data.get("extracted_name") == "Error":
+        return False
+    try:
+        parsed = json.loads(parsed_data.get("raw_parsed_text") or "")
+    except ValueError:
+        return False
+    return isinstance(parsed, dict) and "raw_text_fallback" not in parsed and "error" not in parsed
+
+def parse_resume_content_cached(pdf_file_path, content_hash):
+    """Serves repeat uploads of the same PDF from the parse cache; only successful parses are stored."""
+    with stage_timer("parse_cache_lookup"):
+        cached = parse_cache.get(content_hash)
+    if cached is not None:
+        cached["cache_hit"] = True
+        return cached
+    parsed_data = parse_resume_content(pdf_file_path)
+    if is_successful_parse(parsed_data):
+        parse_cache.put(content_hash, parsed_data)
+    parsed_data["cache_hit"] = False
+    return parsed_data
+
+def resume_check_contents(resume_text):
+    """Builds the model input for resume_check_content; shared by the blocking and streaming paths."""
     prompt = """
     Review the following resume text for:
     - **Fake certifications:** Point out any certifications that seem suspicious or unverified.
@@ -141,16 +1695,22 @@ def resume_check_content(resume_text):
 
     Return a comprehensive summary of red flags or areas to improve. Be specific, constructive, and provide actionable advice.
     """
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[prompt, resume_text]
+    return [prompt, resume_text]
+
+@llm_cached("resume_check", "v1")
+def resume_check_content(resume_text):
+    """Performs a smart check on the resume text for common issues."""
+    if not resume_text:
+        return "Please parse a resume first."
+    response = generate_content(
+        "resume_check",
+        model=ANALYSIS_MODEL,
+        contents=resume_check_contents(resume_text)
     )
     return response.text
 
-def jd_match_content(resume_text, jd_text):
-    """Compares resume skills with job description requirements and generates a match table."""
-    if not resume_text or not jd_text:
-        return "Please parse a resume and provide a job description."
+def jd_match_contents(resume_text, jd_text):
+    """Builds the model input for jd_match_content; shared by the blocking and streaming paths."""
     prompt = f"""
     Compare the following resume text with the job description.
     Resume:
@@ -167,16 +1727,22 @@ def jd_match_content(resume_text, jd_text):
     - "Match Score (0-1)": Provide a numerical score from 0 to 1 (e.g., 0.8, 0.5, 0.2) indicating the strength of the match for that specific skill. A score of 1 means a perfect match, 0 means no match.
     Ensure the output is a valid Markdown table.
     """
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[prompt, resume_text, jd_text]
-    )
-    return response.text
+    return [prompt, resume_text, jd_text]
 
-def generate_questions_content(resume_text, jd_text):
-    """Generates interview questions and best answers based on resume and JD."""
+@llm_cached("jd_match", "v1")
+def jd_match_content(resume_text, jd_text):
+    """Compares resume skills with job description requirements and generates a match table."""
     if not resume_text or not jd_text:
         return "Please parse a resume and provide a job description."
+    response = generate_content(
+        "jd_match",
+        model=ANALYSIS_MODEL,
+        contents=jd_match_contents(resume_text, jd_text)
+    )
+    return response.text
+
+def generate_questions_contents(resume_text, jd_text):
+    """Builds the model input for generate_questions_content; shared by the blocking and streaming paths."""
     prompt = f"""
     Based on the provided resume and job description, generate:
     - 5 Technical Interview Questions
@@ -204,16 +1770,22 @@ def generate_questions_content(resume_text, jd_text):
     |---|---|
     | Imagine a user reports a critical bug in your deployed application. Walk me through your steps to diagnose and resolve it. | First, I'd gather details from the user (reproduction steps, error messages). Then, I'd check logs and monitoring tools for anomalies. I'd try to reproduce the bug in a development environment. Once reproduced, I'd use debugging tools to pinpoint the root cause. After fixing, I'd write unit/integration tests, deploy to a staging environment for validation, and finally push to production, communicating updates to the user throughout. |
     """
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[prompt, resume_text, jd_text]
-    )
-    return response.text
+    return [prompt, resume_text, jd_text]
 
-def fit_score_content(resume_text, jd_text):
-    """Analyzes how well the resume fits the job description and returns a score."""
+@llm_cached("generate_questions", "v1")
+def generate_questions_content(resume_text, jd_text):
+    """Generates interview questions and best answers based on resume and JD."""
     if not resume_text or not jd_text:
         return "Please parse a resume and provide a job description."
+    response = generate_content(
+        "generate_questions",
+        model=ANALYSIS_MODEL,
+        contents=generate_questions_contents(resume_text, jd_text)
+    )
+    return response.text
+
+def fit_score_contents(resume_text, jd_text):
+    """Builds the model input for fit_score_content; shared by the blocking and streaming paths."""
     prompt = f"""
     Analyze how well the following resume text fits the job description.
     Resume:
@@ -241,27 +1813,87 @@ def fit_score_content(resume_text, jd_text):
         * Quantify achievements in experience.
         * Add a summary tailored to the JD.
     """
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[prompt, resume_text, jd_text]
+    return [prompt, resume_text, jd_text]
+
+@llm_cached("fit_score", "v1")
+def fit_score_content(resume_text, jd_text):
+    """Analyzes how well the resume fits the job description and returns a score."""
+    if not resume_text or not jd_text:
+        return "Please parse a resume and provide a job description."
+    response = generate_content(
+        "fit_score",
+        model=ANALYSIS_MODEL,
+        contents=fit_score_contents(resume_text, jd_text)
     )
     return response.text
 
+# --- Streaming Analyses (Server-Sent Events) ---
+# Each streaming route forwards model chunks as they arrive instead of holding the full text.
+# Completed streams populate the same response cache as the blocking routes, and cache hits
+# are sent as a single chunk.
+ANALYSIS_STREAMS = {
+    "resume_check": (resume_check_content, resume_check_contents, ("resume_text",), "Please parse a resume first."),
+    "jd_match": (jd_match_content, jd_match_contents, ("resume_text", "jd_text"), "Please parse a resume and provide a job description."),
+    "generate_questions": (generate_questions_content, generate_questions_contents, ("resume_text", "jd_text"), "Please parse a resume and provide a job description."),
+    "fit_score": (fit_score_content, fit_score_contents, ("resume_text", "jd_text"), "Please parse a resume and provide a job description."),
+}
+
+def sse_event(data, event=None):
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
+def stream_analysis(name, args):
+    """Yields the analysis text in chunks: from the cache when possible, otherwise from generate_content_stream."""
+    content_fn, contents_fn, _, guard_message = ANALYSIS_STREAMS[name]
+    if not all(args):
+        yield guard_message
+        return
+    key = response_cache_key(content_fn.cache_name, content_fn.cache_version, args)
+    cached = response_cache.get(key) if response_cache is not None else None
+    if cached is not None:
+        record_cache_event(content_fn.cache_name, "hits")
+        yield cached
+        return
+    if response_cache is not None:
+        record_cache_event(content_fn.cache_name, "misses")
+    chunks = []
+    for chunk in generate_content_stream(name, model=ANALYSIS_MODEL, contents=contents_fn(*args)):
+        if chunk.text:
+            chunks.append(chunk.text)
+            yield chunk.text
+    if response_cache is not None and chunks:
+        response_cache.put(key, "".join(chunks))
+        record_cache_event(content_fn.cache_name, "stores")
+
+def sse_analysis_response(name, data):
+    """Wraps stream_analysis as an SSE response: `data: {"delta": ...}` events, then `event: done` (or `event: error`)."""
+    args = tuple(data.get(field) for field in ANALYSIS_STREAMS[name][2])
+    def events():
+        yield ": stream open\n\n"  # Flushes headers so the client sees the first byte immediately
+        try:
+            for text in stream_analysis(name, args):
+                yield sse_event({"delta": text})
+            yield sse_event({}, event="done")
+        except Exception as e:
+            yield sse_event({"error": f"Error: {e}"}, event="error")
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 def convert_json_to_markdown_table_programmatic(json_string):
     """
     Parses the JSON string (expected from parse_resume_content) and programmatically
     generates a Markdown table, using HTML line breaks for multi-line content.
     """
     if not json_string: return "No resume data to display in table. Please parse a resume first."
+    raw_text = None
     try:
-        parsed_data = json.loads(json_string)
-        if isinstance(parsed_data, dict) and "raw_text_fallback" in parsed_data:
-            return generate_table_from_raw_text(parsed_data["raw_text_fallback"])
-        if not isinstance(parsed_data, dict):
-            return generate_table_from_raw_text(json_string)
-    except (json.JSONDecodeError, Exception):
-        return generate_table_from_raw_text(json_string)
-    
+        stored = repair_json(json_string)
+        raw_text = stored.get("raw_text_fallback") if isinstance(stored, dict) else None
+        parsed_data = parse_resume_record(raw_text).model_dump() if raw_text else resume_record_model().model_validate(stored).model_dump()
+    except ValueError:
+        # Nothing recoverable: show the raw model output rather than paying for another model call
+        raw = str(raw_text or json_string).replace("|", "\\|").replace("\n", "<br>")
+        return "\n".join(["| Category | Details |", "|---|---|", f"| **Raw Output** | {raw} |"])
+
     table_lines = ["| Category | Details |", "|---|---|"]
     categories_order = ["name", "email", "phone", "education", "skills", "experience", "projects"]
     for category in categories_order:
@@ -284,7 +1916,7 @@ def convert_json_to_markdown_table_programmatic(json_string):
                         lines.append(f"- **{item.get('name')}** (Technologies: {', '.join(item.get('technologies', []))}):")
                         lines.extend([f"  - {out}" for out in item.get('outcomes', [])])
             formatted_details = "<br>".join(lines)
-        elif isinstance(details, dict):
+        elif isinstance(details, dict) and details:
             lines = [f"**{key}:** {', '.join(val)}" for key, val in details.items()]
             formatted_details = "<br>".join(lines)
         elif isinstance(details, str) and details:
@@ -293,51 +1925,673 @@ def convert_json_to_markdown_table_programmatic(json_string):
     return "\n".join(table_lines)
 
 
-def generate_table_from_raw_text(raw_text):
+# --- Consolidated Analysis ---
+# ANALYSIS_MODE='combined' produces all four analyses in one structured model call, so the resume
+# and JD are sent (and billed) once per candidate. The per-endpoint routes then serve their slice
+# of that cached document; the first route hit pays for the call and the others are cache hits.
+ANALYSIS_MODE = os.getenv('ANALYSIS_MODE', 'separate')
+@functools.cache
+def combined_analysis_config():
+    return genai_types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=_object_schema(resume_check=_string_schema(), jd_match=_string_schema(),
+                                       generate_questions=_string_schema(), fit_score=_string_schema()),
+    )
+
+def combined_analysis_contents(resume_text, jd_text):
+    """Builds the model input for combined_analysis_content."""
+    prompt = """
+    You are screening a candidate. Using the resume and job description below, return one JSON object with four Markdown fields:
+
+    "resume_check": Review the resume for fake or unverified certifications, outdated technologies, grammar and spelling issues,
+    missing project descriptions (technologies, outcomes, contributions), readability and conciseness, and achievements that
+    could be quantified. Give a specific, constructive summary of red flags and actionable advice.
+
+    "jd_match": A Markdown skill match table with exactly 4 columns: "Skill", "Mentioned in Resume", "Required by JD",
+    "Match Score (0-1)". List 10-15 key skills, prioritizing those in the JD; use Yes/No for the middle columns and a
+    number from 0 to 1 for the score.
+
+    "generate_questions": Three Markdown sections, "## Technical Interview Questions", "## Behavioral Interview Questions" and
+    "## Scenario-Based Interview Questions", each a table with columns "Question" and "Best Answer" and 5 questions. Best answers
+    should be concise and draw on the candidate's resume where relevant.
+
+    "fit_score": The first line MUST be "Score: X.X/10", then a blank line, then "### Justification:" followed by bullet points
+    for **Skill Alignment**, **Experience Relevance**, **Overall Suitability** and **Areas for Improvement** (2-3 concrete suggestions).
     """
-    Fallback function: If direct JSON parsing fails, send the entire raw text
-    from the initial resume parsing to the LLM and ask it to format it into a table.
-    This leverages the LLM's understanding to salvage messy output.
+    return [prompt, f"Resume:\n{resume_text}", f"Job Description:\n{jd_text}"]
+
+def is_combined_analysis(result):
+    try:
+        data = repair_json(result)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and all(isinstance(data.get(name), str) and data[name] for name in ANALYSIS_TASKS)
+
+@llm_cached("combined_analysis", "v1", cacheable=is_combined_analysis)
+def combined_analysis_content(resume_text, jd_text):
+    """Runs all four analyses in one structured call; returns the JSON document as text."""
+    response = generate_content(
+        "combined_analysis",
+        model=ANALYSIS_MODEL,
+        contents=combined_analysis_contents(resume_text, jd_text),
+        config=combined_analysis_config()
+    )
+    return response.text
+
+def analysis_output(name, resume_text, jd_text=None):
+    """
+    Returns one analysis. In combined mode (and when both inputs are present) it is sliced from the
+    consolidated document; if that document is unusable the analysis falls back to its own call.
     """
-    if not raw_text:
-        return "Could not generate table. Raw resume output was empty."
+    if ANALYSIS_MODE == 'combined' and resume_text and jd_text:
+        result = combined_analysis_content(resume_text, jd_text)
+        if is_combined_analysis(result):
+            return repair_json(result)[name]
+    return ANALYSIS_TASKS[name](resume_text, jd_text)
 
-    prompt = f"""
-    I have a raw text output that attempts to parse a resume. This text might contain JSON,
-    or it might be a mix of text and incomplete JSON. Your task is to extract the following
-    categories and present them in a Markdown table with two columns: "Category" and "Details".
-
-    The categories you must look for are:
-    - Name
-    - Email
-    - Phone
-    - Education
-    - Skills
-    - Work Experience
-    - Projects
-
-    **Formatting Rules for 'Details' column:**
-    - Use HTML line breaks (`<br>`) for all new lines within a table cell.
-    - For lists of items (like Skills, Education summaries, or individual responsibilities/outcomes within Experience/Projects), use Markdown bullet points (`- `) followed by `<br>`.
-    - For multi-line entries within Experience or Projects, ensure clear indentation for sub-bullets (e.g., `  - ` followed by `<br>`).
-    - If a category is not found or is empty, state "N/A".
-    - Do NOT truncate any information. Include all details found for each category.
-
-    Here is the raw resume output text:
-    ---
-    {raw_text}
-    ---
-
-    Please generate only the Markdown table.
+
+# --- Concurrent Analysis Fan-Out ---
+# All four analyses only need resume_text/jd_text, so /analyze runs them side by side on a
+# bounded greenlet pool; end-to-end latency is roughly that of the slowest call.
+ANALYSIS_POOL_SIZE = int(os.getenv('ANALYSIS_POOL_SIZE', 32))
+ANALYSIS_TASK_TIMEOUT = float(os.getenv('ANALYSIS_TASK_TIMEOUT', 90))
+ANALYSIS_TASKS = {
+    "resume_check": lambda resume_text, jd_text: resume_check_content(resume_text),
+    "jd_match": jd_match_content,
+    "generate_questions": generate_questions_content,
+    "fit_score": fit_score_content,
+}
+
+analysis_pool = Pool(ANALYSIS_POOL_SIZE)
+
+def run_with_timeout(timeout, fn, *args):
+    """Returns (output, error) so failures stay in the response instead of the hub's error log."""
+    try:
+        return gevent.with_timeout(timeout, fn, *args), None
+    except gevent.Timeout:
+        return None, f"Timed out after {timeout:g}s"
+    except Exception as e:
+        return None, f"Error: {e}"
+
+def run_analysis_task(name, resume_text, jd_text, timeout):
+    return run_with_timeout(timeout, analysis_output, name, resume_text, jd_text)
+
+def run_analyses(resume_text, jd_text, task_names=None, timeout=ANALYSIS_TASK_TIMEOUT):
+    """
+    Runs the requested analyses concurrently, each under its own timeout.
+    Returns (results, errors); a failed or timed-out task only appears in errors.
+    """
+    task_names = task_names or list(ANALYSIS_TASKS)
+    greenlets = {name: analysis_pool.spawn(run_analysis_task, name, resume_text, jd_text, timeout) for name in task_names}
+    gevent.joinall(list(greenlets.values()))
+    results, errors = {}, {}
+    for name, greenlet in greenlets.items():
+        output, error = greenlet.value
+        if error:
+            errors[name] = error
+        else:
+            results[name] = output
+    return results, errors
+
+
+# --- Bulk Ingestion Jobs ---
+# Uploaded files are spooled locally, published to `storage` under BATCH_UPLOAD_DIR/<job_id>/ and
+# every item is a row in the metadata DB whose stored_path is the storage key, so any worker can process it.
+# Workers claim items with a lease, so items held by a crashed or restarted worker are picked
+# up again once the lease expires; nothing about a job lives only in process memory.
+BATCH_UPLOAD_DIR = 'uploads/batch_jobs'
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 4))
+BATCH_MAX_ITEMS_PER_MINUTE = int(os.getenv('BATCH_MAX_ITEMS_PER_MINUTE', 60))
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 500))
+BATCH_MAX_FILE_BYTES = int(os.getenv('BATCH_MAX_FILE_BYTES', 10 * 1024 * 1024))
+BATCH_LEASE_SECONDS = int(os.getenv('BATCH_LEASE_SECONDS', 300))
+BATCH_MAX_ATTEMPTS = int(os.getenv('BATCH_MAX_ATTEMPTS', 3))
+BATCH_POLL_INTERVAL = float(os.getenv('BATCH_POLL_INTERVAL', 2))
+BATCH_CLAIM_BUSY_TIMEOUT = 0.05
+BATCH_QA_PLACEHOLDER = "Interview Q&A was not generated for this bulk-ingested resume."
+
+def utc_timestamp():
+    """Same format as the frontend's `new Date().toISOString()`."""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+def init_batch_store():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                id TEXT PRIMARY KEY,
+                jd_role TEXT NOT NULL DEFAULT '',
+                jd_text TEXT NOT NULL DEFAULT '',
+                auto_confirm INTEGER NOT NULL DEFAULT 0,
+                include_questions INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL
+            )""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                original_filename TEXT NOT NULL,
+                stored_path TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL NOT NULL DEFAULT 0,
+                person_name TEXT,
+                fit_score TEXT,
+                fit_score_value REAL,
+                saved_id TEXT,
+                error TEXT,
+                updated_at TEXT
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_items_job ON batch_items (job_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_items_status ON batch_items (status, lease_until)")
+
+def spool_batch_uploads(job_dir, files):
+    """Writes uploaded PDFs (and PDFs inside uploaded zips) into job_dir; returns [(original_filename, path)]."""
+    spooled = []
+    def spool(name, stream):
+        if len(spooled) >= BATCH_MAX_FILES:
+            raise ValueError(f"A batch may contain at most {BATCH_MAX_FILES} files")
+        original_filename = secure_filename(os.path.basename(name)) or "resume.pdf"
+        path = os.path.join(job_dir, f"{len(spooled):05d}_{original_filename}")
+        try:
+            spool_upload(stream, path, BATCH_MAX_FILE_BYTES, require_pdf_header=False)  # Bad PDFs fail per item, not per batch
+        except UploadRejected as e:
+            raise ValueError(f"{name}: {e}") from None
+        spooled.append((original_filename, path))
+
+    for file in files:
+        if file.filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(file.stream) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not member.filename.lower().endswith('.pdf'): continue
+                    if member.file_size > BATCH_MAX_FILE_BYTES:
+                        raise ValueError(f"{member.filename} exceeds the {BATCH_MAX_FILE_BYTES} byte limit")
+                    with archive.open(member) as stream:
+                        spool(member.filename, stream)
+        elif file.filename.lower().endswith('.pdf'):
+            spool(file.filename, file.stream)
+    return spooled
+
+def create_batch_job(files, jd_role, jd_text, auto_confirm, include_questions):
+    job_id = str(uuid.uuid4())
+    job_dir = os.path.join(BATCH_UPLOAD_DIR, job_id)
+    os.makedirs(job_dir)
+    published = []
+    try:
+        spooled = spool_batch_uploads(job_dir, files)
+        if not spooled:
+            raise ValueError("No PDF files found in the upload")
+        for name, path in spooled:
+            key = f"{BATCH_UPLOAD_DIR}/{job_id}/{os.path.basename(path)}"
+            storage.put_file(key, path, move=True)  # A no-op for local storage, where the spool path is the key
+            published.append((name, key))
+    except Exception:
+        for _, key in published:
+            storage.delete(key)
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    if storage.local_path(published[0][1]) is None:
+        shutil.rmtree(job_dir, ignore_errors=True)  # Only held the local spool copies
+    now = utc_timestamp()
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("INSERT INTO batch_jobs (id, jd_role, jd_text, auto_confirm, include_questions, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                     (job_id, jd_role, jd_text, int(auto_confirm), int(include_questions), now))
+        conn.executemany("INSERT INTO batch_items (job_id, original_filename, stored_path, updated_at) VALUES (?, ?, ?, ?)",
+                         [(job_id, name, key, now) for name, key in published])
+    return job_id, len(spooled)
+
+def claim_batch_item():
     """
+    Atomically leases the next pending (or lease-expired) item, across all workers. SQLite waits for a
+    lock inside C, which blocks every greenlet in the worker, so the claim only waits briefly and a
+    locked DB counts as nothing to claim until the next poll.
+    """
+    now = time.time()
+    try:
+        return _claim_batch_item(now)
+    except sqlite3.OperationalError as e:
+        if "locked" in str(e):
+            return None
+        raise
+
+def _claim_batch_item(now):
+    with closing(metadata_db(BATCH_CLAIM_BUSY_TIMEOUT)) as conn, conn:
+        row = conn.execute("""
+            UPDATE batch_items SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ?
+            WHERE id = (
+                SELECT id FROM batch_items
+                WHERE status = 'pending' OR (status = 'running' AND lease_until < ?)
+                ORDER BY id LIMIT 1)
+            RETURNING id, job_id, original_filename, stored_path, attempts""",
+            (now + BATCH_LEASE_SECONDS, utc_timestamp(), now)).fetchone()
+        if row is None:
+            return None
+        job = conn.execute("SELECT * FROM batch_jobs WHERE id = ?", (row["job_id"],)).fetchone()
+    return dict(row), dict(job) if job else None
+
+def finish_batch_item(item_id, status, **fields):
+    fields.update(status=status, lease_until=0, updated_at=utc_timestamp())
+    with closing(metadata_db()) as conn, conn:
+        conn.execute(f"UPDATE batch_items SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?", [*fields.values(), item_id])
+
+def process_batch_item(item, job):
+    """parse -> fit score -> optional confirm into the saved store, for one spooled file."""
+    key = item["stored_path"]
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[prompt, raw_text]
-        )
-        return response.text
+        if job is None or not storage.exists(key):
+            raise FileNotFoundError("Spooled resume file is missing")
+        with local_copy(key) as path:
+            validate_pdf(path)
+            parsed = parse_resume_content_cached(path, file_sha256(path))
+        if parsed.get("extracted_name") == "Error":
+            raise RuntimeError(json.loads(parsed["raw_parsed_text"]).get("error", "Resume parsing failed"))
+        resume_text = parsed["raw_parsed_text"]
+        fit_score = fit_score_content(resume_text, job["jd_text"]) if job["jd_text"] else ""
+        result = {"person_name": parsed["extracted_name"], "fit_score": fit_score, "fit_score_value": parse_fit_score_value(fit_score) if fit_score else None}
+        if job["auto_confirm"]:
+            qa_text = generate_questions_content(resume_text, job["jd_text"]) if job["include_questions"] and job["jd_text"] else BATCH_QA_PLACEHOLDER
+            upload_key = temp_upload_key(f"{uuid.uuid4()}_{item['original_filename']}")
+            storage.move(key, upload_key)
+            result["saved_id"] = save_confirmed_resume(upload_key, item["original_filename"], parsed["extracted_name"],
+                                                       job["jd_role"] or "Custom Input", fit_score, qa_text, utc_timestamp(),
+                                                       resume_json=resume_text)
+        else:
+            storage.delete(key)
+        finish_batch_item(item["id"], "done", **result)
     except Exception as e:
-        return f"Error using LLM to generate table from raw text: {e}"
+        if item["attempts"] < BATCH_MAX_ATTEMPTS and not isinstance(e, (FileNotFoundError, UploadRejected)):
+            finish_batch_item(item["id"], "pending", error=str(e))
+        else:
+            finish_batch_item(item["id"], "failed", error=str(e))
+            storage.delete(key)
+
+batch_pool = Pool(BATCH_WORKERS)
+
+def batch_dispatcher():
+    """Long-running greenlet: claims items while the pool has room, spacing starts to respect the rate limit."""
+    min_interval = 60.0 / BATCH_MAX_ITEMS_PER_MINUTE if BATCH_MAX_ITEMS_PER_MINUTE > 0 else 0
+    while True:
+        batch_pool.wait_available()
+        try:
+            claimed = claim_batch_item()
+        except sqlite3.Error as e:
+            print(f"Error claiming batch item: {e}")
+            claimed = None
+        if claimed is None:
+            gevent.sleep(BATCH_POLL_INTERVAL)
+            continue
+        batch_pool.spawn(process_batch_item, *claimed)
+        gevent.sleep(min_interval)
+
+def get_batch_job(job_id):
+    with closing(metadata_db()) as conn:
+        job = conn.execute("SELECT id, jd_role, auto_confirm, include_questions, created_at FROM batch_jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        items = conn.execute("""
+            SELECT id, original_filename, status, attempts, person_name, fit_score, fit_score_value, saved_id, error, updated_at
+            FROM batch_items WHERE job_id = ? ORDER BY id""", (job_id,)).fetchall()
+    counts = {status: 0 for status in ("pending", "running", "done", "failed")}
+    for item in items:
+        counts[item["status"]] += 1
+    finished = counts["done"] + counts["failed"]
+    return {
+        **dict(job), "auto_confirm": bool(job["auto_confirm"]), "include_questions": bool(job["include_questions"]),
+        "status": "completed" if finished == len(items) else "running", "total": len(items), "counts": counts,
+        "progress": round(finished / len(items), 4) if items else 1.0, "items": [dict(item) for item in items],
+    }
+
+def clear_batch_jobs():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("DELETE FROM batch_items")
+        conn.execute("DELETE FROM batch_jobs")
+    storage.delete_prefix(BATCH_UPLOAD_DIR)
+
+
+# --- Candidate Ranking Index ---
+# A BM25 inverted index over the parsed resume JSON of every confirmed resume, kept in the
+# metadata DB and updated as each resume is saved. /rank_candidates scores a JD against it
+# locally; only the optional re-rank of the top few candidates calls the model.
+# A PDF confirmed for several roles has one entry per role but is ranked once: entries are grouped
+# by their resume blob (artifacts.sha256) and the newest one stands for the group.
+RANK_BM25_K1 = 1.2
+RANK_BM25_B = 0.75
+RANK_RERANK_MAX = int(os.getenv('RANK_RERANK_MAX', 10))
+# Skills and technologies say more about fit than free-text responsibilities.
+RANK_FIELD_WEIGHTS = {"skills": 3.0, "technologies": 2.0, "title": 2.0, "degree": 1.0, "text": 1.0}
+RANK_STOPWORDS = set("""
+    a an and are as at be by experience for from in is it of on or our skills strong the to with we you your
+    using use used knowledge ability required plus preferred etc work working including such like also
+""".split())
+SKILL_PHRASES = {
+    "machine learning": "machine_learning", "deep learning": "deep_learning", "natural language processing": "nlp",
+    "computer vision": "computer_vision", "data structures": "data_structures", "react native": "react_native",
+    "spring boot": "spring_boot", "google cloud": "gcp", "amazon web services": "aws", "ci/cd": "cicd",
+    "power bi": "power_bi", "unreal engine": "unreal", "smart contracts": "smart_contract", "smart contract": "smart_contract",
+}
+SKILL_SYNONYMS = {
+    "js": "javascript", "ecmascript": "javascript", "ts": "typescript", "reactjs": "react", "react.js": "react",
+    "node": "nodejs", "node.js": "nodejs", "vue.js": "vue", "vuejs": "vue", "angularjs": "angular", "express.js": "express",
+    "expressjs": "express", "golang": "go", "py": "python", "python3": "python", "k8s": "kubernetes", "postgres": "postgresql",
+    "psql": "postgresql", "mongo": "mongodb", "tf": "tensorflow", "sklearn": "scikit-learn", "scikit": "scikit-learn",
+    "ml": "machine_learning", "dl": "deep_learning", "ai": "artificial_intelligence", "amazon": "aws", "ec2": "aws", "s3": "aws", "sagemaker": "aws", "c-sharp": "c#", "csharp": "c#", "cpp": "c++",
+    "restful": "rest", "apis": "api", "microservice": "microservices", "dockerized": "docker", "containers": "docker",
+}
+
+def rank_tokens(text):
+    """Lowercases, folds multi-word skills into single tokens, then maps synonyms to canonical skill names."""
+    text = str(text or "").lower()
+    for phrase, token in SKILL_PHRASES.items():
+        text = text.replace(phrase, token)
+    tokens = []
+    for raw in re.findall(r'[a-z0-9_+#.-]+', text):
+        token = raw.strip('.-')
+        token = SKILL_SYNONYMS.get(raw, SKILL_SYNONYMS.get(token, token))
+        if len(token) > 1 and token not in RANK_STOPWORDS and not token.isdigit():
+            tokens.append(token)
+    return tokens
+
+def resume_term_weights(resume):
+    """Weighted term frequencies for one parsed resume (see RANK_FIELD_WEIGHTS)."""
+    fields = {"skills": [], "technologies": [], "title": [], "degree": [], "text": []}
+    skills = resume.get("skills")
+    if isinstance(skills, dict):
+        for values in skills.values():
+            fields["skills"].extend(values if isinstance(values, list) else [values])
+    elif isinstance(skills, list):
+        fields["skills"].extend(skills)
+    for item in resume.get("experience") or []:
+        if not isinstance(item, dict): continue
+        fields["title"].append(item.get("title"))
+        fields["text"].extend(item.get("responsibilities") or [])
+    for item in resume.get("projects") or []:
+        if not isinstance(item, dict): continue
+        fields["technologies"].extend(item.get("technologies") or [])
+        fields["text"].append(item.get("name"))
+        fields["text"].extend(item.get("outcomes") or [])
+    for item in resume.get("education") or []:
+        if isinstance(item, dict): fields["degree"].append(item.get("degree"))
+    weights = {}
+    for field, values in fields.items():
+        for token in rank_tokens(" ".join(str(v) for v in values if v)):
+            weights[token] = weights.get(token, 0.0) + RANK_FIELD_WEIGHTS[field]
+    return weights
+
+def init_rank_index():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rank_docs (
+                resume_id TEXT PRIMARY KEY,
+                resume_json TEXT NOT NULL,
+                length REAL NOT NULL
+            )""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rank_postings (
+                term TEXT NOT NULL,
+                resume_id TEXT NOT NULL,
+                weight REAL NOT NULL,
+                PRIMARY KEY (term, resume_id)
+            ) WITHOUT ROWID""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rank_postings_resume ON rank_postings (resume_id)")
+
+def index_resume(resume_id, resume_json):
+    """Adds (or replaces) one resume's postings; called whenever a resume is confirmed."""
+    try:
+        resume = json.loads(resume_json)
+    except (TypeError, json.JSONDecodeError):
+        return
+    if not isinstance(resume, dict) or "raw_text_fallback" in resume or "error" in resume:
+        return
+    weights = resume_term_weights(resume)
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("DELETE FROM rank_postings WHERE resume_id = ?", (resume_id,))
+        conn.execute("INSERT OR REPLACE INTO rank_docs (resume_id, resume_json, length) VALUES (?, ?, ?)",
+                     (resume_id, resume_json, sum(weights.values())))
+        conn.executemany("INSERT INTO rank_postings (term, resume_id, weight) VALUES (?, ?, ?)",
+                         [(term, resume_id, weight) for term, weight in weights.items()])
+
+# Joins a rank_docs row (alias d) to its saved entry and the blob that identifies the document
+RANK_DOC_JOIN = """
+    JOIN resumes r ON r.id = d.resume_id
+    LEFT JOIN artifacts a ON a.name = r.resume_filename"""
+RANK_DOC_KEY = "COALESCE(a.sha256, d.resume_id)"
+
+def rank_candidates(jd_text, top_k=20, role=None):
+    """
+    BM25 over the weighted resume terms, one result per distinct resume document.
+    Returns [(resume_id, score, matched_terms, saved_roles)] best first; resume_id is the newest entry.
+    """
+    query_terms = sorted(set(rank_tokens(jd_text)))
+    if not query_terms:
+        return []
+    placeholders = ", ".join("?" * len(query_terms))
+    with closing(metadata_db()) as conn:
+        doc_count, avg_length = conn.execute(
+            f"SELECT COUNT(DISTINCT {RANK_DOC_KEY}), COALESCE(AVG(d.length), 0) FROM rank_docs d {RANK_DOC_JOIN}").fetchone()
+        if not doc_count:
+            return []
+        sql = f"""
+            SELECT p.term, p.resume_id, p.weight, d.length, r.seq, {RANK_DOC_KEY} AS doc_key
+            FROM rank_postings p JOIN rank_docs d ON d.resume_id = p.resume_id {RANK_DOC_JOIN}
+            WHERE p.term IN ({placeholders})"""
+        params = list(query_terms)
+        if role and role != 'All Roles':
+            sql += " AND r.jd_role = ?"
+            params.append(role)
+        postings = conn.execute(sql, params).fetchall()
+        document_frequency = dict(conn.execute(f"""
+            SELECT p.term, COUNT(DISTINCT {RANK_DOC_KEY})
+            FROM rank_postings p JOIN rank_docs d ON d.resume_id = p.resume_id {RANK_DOC_JOIN}
+            WHERE p.term IN ({placeholders}) GROUP BY p.term""", query_terms).fetchall())
+    scores, matched, newest = {}, {}, {}
+    for term, resume_id, weight, length, seq, doc_key in postings:
+        df = document_frequency[term]
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        norm = weight + RANK_BM25_K1 * (1 - RANK_BM25_B + RANK_BM25_B * length / (avg_length or 1))
+        scores[resume_id] = scores.get(resume_id, 0.0) + idf * weight * (RANK_BM25_K1 + 1) / norm
+        matched.setdefault(resume_id, []).append(term)
+        if doc_key not in newest or seq > newest[doc_key][0]:
+            newest[doc_key] = (seq, resume_id)
+    ranked = sorted(((doc_key, resume_id) for doc_key, (_, resume_id) in newest.items()),
+                    key=lambda item: scores[item[1]], reverse=True)[:top_k]
+    saved_roles = {}
+    if ranked:
+        keys = [doc_key for doc_key, _ in ranked]
+        key_placeholders = ", ".join("?" * len(keys))
+        with closing(metadata_db()) as conn:
+            for doc_key, jd_role in conn.execute(f"""
+                    SELECT COALESCE(a.sha256, r.id), r.jd_role FROM resumes r LEFT JOIN artifacts a ON a.name = r.resume_filename
+                    WHERE a.sha256 IN ({key_placeholders}) OR r.id IN ({key_placeholders}) ORDER BY r.seq""", keys + keys):
+                roles = saved_roles.setdefault(doc_key, [])
+                if jd_role not in roles:
+                    roles.append(jd_role)
+    return [(resume_id, scores[resume_id], sorted(matched[resume_id]), saved_roles.get(doc_key, [])) for doc_key, resume_id in ranked]
+
+def rerank_with_llm(candidates, jd_text):
+    """Re-scores candidates with fit_score_content concurrently; each gets `llm_fit_score` and `llm_fit_score_value`."""
+    with closing(metadata_db()) as conn:
+        resume_json = dict(conn.execute(
+            f"SELECT resume_id, resume_json FROM rank_docs WHERE resume_id IN ({', '.join('?' * len(candidates))})",
+            [c["id"] for c in candidates]).fetchall())
+    greenlets = [analysis_pool.spawn(run_analysis_task, "fit_score", resume_json.get(c["id"]), jd_text, ANALYSIS_TASK_TIMEOUT) for c in candidates]
+    gevent.joinall(greenlets)
+    for candidate, greenlet in zip(candidates, greenlets):
+        output, error = greenlet.value
+        candidate["llm_fit_score"] = output if not error else error
+        candidate["llm_fit_score_value"] = parse_fit_score_value(output) if not error else None
+    return sorted(candidates, key=lambda c: (c["llm_fit_score_value"] is not None, c["llm_fit_score_value"] or 0), reverse=True)
+
+def prune_rank_index():
+    """Drops index rows for resumes that no longer exist (e.g. after /clear_all_data)."""
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("DELETE FROM rank_postings WHERE resume_id NOT IN (SELECT id FROM resumes)")
+        conn.execute("DELETE FROM rank_docs WHERE resume_id NOT IN (SELECT id FROM resumes)")
+
+def clear_rank_index():
+    with closing(metadata_db()) as conn, conn:
+        conn.execute("DELETE FROM rank_postings")
+        conn.execute("DELETE FROM rank_docs")
+
+
+# --- Multi-JD Fit Scoring ---
+# Scores one resume against many JDs. 'parallel' runs the regular fit_score_content per JD on the
+# analysis pool (each result is cached individually); 'single' sends the resume once with every JD
+# and gets all scores back from one structured call.
+FIT_SCORE_BATCH_MAX_JDS = int(os.getenv('FIT_SCORE_BATCH_MAX_JDS', 25))
+@functools.cache
+def multi_jd_score_config():
+    return genai_types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema={"type": "ARRAY", "items": _object_schema(role=_string_schema(), score=_number_schema(), justification=_string_schema())},
+    )
+
+def multi_jd_fit_contents(resume_text, jds):
+    prompt = """
+    Score how well the candidate's resume fits EACH of the job descriptions below, independently.
+    For every job description return an object with "role" (exactly as given), "score" (a number from 0 to 10, one decimal)
+    and "justification" (2-3 sentences on skill alignment, experience relevance and the main gap).
+    Return one object per job description, in the order given.
+    """
+    jd_block = "\n\n".join(f"Role: {role}\nJob Description:\n{jd_text}" for role, jd_text in jds.items())
+    return [prompt, f"Resume:\n{resume_text}", jd_block]
+
+@llm_cached("multi_jd_fit_score", "v1", cacheable=lambda result: isinstance(repair_json(result), list))
+def multi_jd_fit_content(resume_text, jds_json):
+    """One structured call scoring the resume against every JD in jds_json ({role: jd_text}); returns JSON text."""
+    response = generate_content(
+        "multi_jd_fit_score",
+        model=ANALYSIS_MODEL,
+        contents=multi_jd_fit_contents(resume_text, json.loads(jds_json)),
+        config=multi_jd_score_config()
+    )
+    return response.text
+
+def score_resume_against_jds(resume_text, jds, mode="parallel", timeout=ANALYSIS_TASK_TIMEOUT):
+    """Returns [{"role", "score", "fit_score" | "justification" | "error"}] sorted best first."""
+    results = []
+    if mode == "single":
+        output, error = run_with_timeout(timeout, multi_jd_fit_content, resume_text, json.dumps(jds, sort_keys=True))
+        scored = {}
+        if not error:
+            try:
+                scored = {str(item.get("role")): item for item in repair_json(output) if isinstance(item, dict)}
+            except (ValueError, TypeError) as e:
+                error = f"Error: {e}"
+        for role in jds:
+            item = scored.get(role)
+            if item is None:
+                results.append({"role": role, "score": None, "error": error or "Role missing from model output"})
+            else:
+                try:
+                    score = round(float(item.get("score")), 1)
+                except (TypeError, ValueError):
+                    score = None
+                results.append({"role": role, "score": score, "justification": item.get("justification", "")})
+    else:
+        greenlets = {role: analysis_pool.spawn(run_with_timeout, timeout, fit_score_content, resume_text, jd_text) for role, jd_text in jds.items()}
+        gevent.joinall(list(greenlets.values()))
+        for role, greenlet in greenlets.items():
+            output, error = greenlet.value
+            if error:
+                results.append({"role": role, "score": None, "error": error})
+            else:
+                results.append({"role": role, "score": parse_fit_score_value(output), "fit_score": output})
+    return sorted(results, key=lambda r: (r["score"] is not None, r["score"] or 0), reverse=True)
+
+
+# --- Candidate Export (streamed) ---
+# Every export is a generator over keyset pages of the metadata table (ordered by seq), so memory
+# stays flat however many candidates match, and no read transaction is held between pages.
+# Each record carries its seq; passing the last one received as `after` resumes an interrupted export.
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', 500))
+EXPORT_CHUNK_BYTES = 256 * 1024
+EXPORT_FIELDS = ["seq"] + METADATA_FIELDS
+
+def iter_export_rows(role=None, since=None, until=None, after=0, limit=None, max_seq=None):
+    where, params = ["seq > ?"], [after]
+    if max_seq is not None:
+        where.append("seq <= ?")
+        params.append(max_seq)
+    if role and role != 'All Roles':
+        where.append("jd_role = ?")
+        params.append(role)
+    if since:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        where.append("timestamp <= ?")
+        params.append(until)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_size = EXPORT_PAGE_SIZE if remaining is None else min(EXPORT_PAGE_SIZE, remaining)
+        with closing(metadata_db()) as conn:
+            rows = conn.execute(f"SELECT {', '.join(EXPORT_FIELDS)} FROM resumes WHERE {' AND '.join(where)} ORDER BY seq LIMIT ?",
+                                params + [page_size]).fetchall()
+        for row in rows:
+            yield dict(row)
+        if len(rows) < page_size:
+            return
+        params[0] = rows[-1]["seq"]
+        if remaining is not None:
+            remaining -= len(rows)
+
+def export_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+class ZipStream(io.RawIOBase):
+    """Write-only, unseekable sink for zipfile; `drain()` hands over what has been written so far."""
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def export_archive(make_rows):
+    """
+    Streams a zip of metadata.ndjson plus every matching resume PDF and Q&A file.
+    make_rows(max_seq) is called twice (manifest pass, then file pass) so neither needs to be held in memory;
+    the file pass stops at the manifest's last seq so both cover the same candidates.
+    """
+    sink = ZipStream()
+    last_seq = 0
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("metadata.ndjson", 'w', force_zip64=True) as member:
+            for row in make_rows(None):
+                last_seq = row["seq"]
+                member.write((json.dumps(row) + "\n").encode('utf-8'))
+                yield sink.drain()
+        for row in make_rows(last_seq):
+            for folder, name in (("resumes", row["resume_filename"]), ("interview_qa", row["qa_filename"])):
+                source = open_artifact(name)
+                if source is None:
+                    continue
+                info = zipfile.ZipInfo(f"{folder}/{name}", date_time=time.gmtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED if name.lower().endswith(".pdf") else zipfile.ZIP_DEFLATED
+                with source, archive.open(info, 'w', force_zip64=True) as member:
+                    while chunk := source.read(EXPORT_CHUNK_BYTES):
+                        member.write(chunk)
+                        yield sink.drain()
+    yield sink.drain()
 
 
 # --- Full List of JD Samples Restored ---
@@ -364,6 +2618,61 @@ JD_OPTIONS = {
     "Network Engineer": "Design, implement, and maintain network infrastructure. Expertise in routing protocols (BGP, OSPF), switching, and firewalls. Experience with network monitoring tools, troubleshooting, and security best practices. Certifications like CCNA, CCNP, or JNCIE are highly desirable. Strong understanding of TCP/IP and network security principles."
 }
 
+# --- Startup ---
+# Importing this module only defines things. Directories and DB schemas are created by
+# init_storage() (once per host start, in the gunicorn master when preloading), and the
+# per-process runtime (batch dispatcher and temp-upload reaper greenlets) starts before the first request each
+# worker serves, i.e. always after the fork. Use `gunicorn 'app:create_app()'` (optionally
+# with --preload and STARTUP_WARM_IMPORTS=1); plain `app:app` still works.
+STARTUP_WARM_IMPORTS = os.getenv('STARTUP_WARM_IMPORTS', '0') == '1'
+_storage_ready = False
+_runtime_pid = None
+_runtime_lock = threading.Lock()
+
+def init_storage():
+    global _storage_ready
+    if _storage_ready:
+        return
+    for folder in (UPLOAD_FOLDER, SAVED_RESUMES_DIR, BLOB_DIR, PARSE_CACHE_DIR, BATCH_UPLOAD_DIR, os.path.dirname(METADATA_DB_FILE) or '.'):
+        os.makedirs(folder, exist_ok=True)
+    init_metadata_store()
+    init_blob_store()
+    init_batch_store()
+    init_rank_index()
+    prune_rank_index()
+    if isinstance(response_cache, SQLiteResponseCache):
+        response_cache.init_schema()
+    _storage_ready = True
+
+def warm_imports():
+    for module in HEAVY_MODULES.values():
+        module.load()
+    resume_record_model()
+
+def ensure_runtime():
+    global _runtime_pid
+    if _runtime_pid == os.getpid():
+        return
+    with _runtime_lock:
+        if _runtime_pid == os.getpid():
+            return
+        init_storage()
+        gevent.spawn(batch_dispatcher)
+        gevent.spawn(temp_upload_reaper)
+        _runtime_pid = os.getpid()
+
+@app.before_request
+def start_runtime():
+    ensure_runtime()
+
+def create_app(warm=None):
+    """Application factory: prepares storage (and optionally loads the heavy modules) without starting any greenlets."""
+    init_storage()
+    if STARTUP_WARM_IMPORTS if warm is None else warm:
+        warm_imports()
+    return app
+
+
 # --- CHANGE 5: API ENDPOINTS CORRECTED (NO /api PREFIX) ---
 @app.route('/jd_options', methods=['GET'])
 def get_jd_options():
@@ -381,6 +2690,7 @@ def get_jd_text():
 
 @app.route('/parse_resume', methods=['POST'])
 def api_parse_resume():
+    request.max_content_length = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES  # Must be set before request.files is read
     if 'resume' not in request.files: return jsonify({"error": "No resume file provided"}), 400
     file = request.files['resume']
     if file.filename == '': return jsonify({"error": "No selected file"}), 400
@@ -388,34 +2698,221 @@ def api_parse_resume():
     original_filename = secure_filename(file.filename)
     unique_temp_filename = f"{uuid.uuid4()}_{original_filename}"
     temp_filepath = os.path.join(UPLOAD_FOLDER, unique_temp_filename)
-    file.save(temp_filepath)
 
     try:
-        parsed_data = parse_resume_content(temp_filepath)
+        with stage_timer("upload_save"):
+            content_hash, _ = spool_upload(file.stream, temp_filepath)
+        with stage_timer("upload_validate"):
+            validate_pdf(temp_filepath)
+        parsed_data = parse_resume_content_cached(temp_filepath, content_hash)
+        with stage_timer("upload_share"):
+            storage.put_file(temp_upload_key(unique_temp_filename), temp_filepath, move=True)  # Visible to the worker that confirms
         parsed_data.update({"original_filename": original_filename, "temp_saved_filename": unique_temp_filename})
         return jsonify(parsed_data)
+    except UploadRejected as e:
+        if os.path.exists(temp_filepath): os.remove(temp_filepath)
+        UPLOADS_REJECTED.inc(reason=e.reason)
+        return jsonify({"error": str(e), "display_output": f"```plain\nError: {e}\n```"}), e.status
     except Exception as e:
         if os.path.exists(temp_filepath): os.remove(temp_filepath)
         return jsonify({"error": f"Error: {e}", "display_output": f"```plain\nError: {e}\n```"}), 500
 
+@app.errorhandler(413)
+def request_too_large(e):
+    UPLOADS_REJECTED.inc(reason="request_too_large")
+    return jsonify({"error": f"Request exceeds the {format_bytes(request.max_content_length or MAX_REQUEST_BYTES)} limit."}), 413
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the worker is up and serving. Does no I/O."""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: storage is reachable and a model provider is configured. Never builds the model client."""
+    checks = {"llm_configured": llm_configured()}
+    try:
+        with closing(metadata_db()) as conn:
+            conn.execute("SELECT 1 FROM resumes LIMIT 1")
+        checks["metadata_db"] = True
+    except sqlite3.Error:
+        checks["metadata_db"] = False
+    checks["storage"] = storage.ping()
+    ready = all(checks.values())
+    return jsonify({
+        "status": "ready" if ready else "not_ready", "checks": checks, "pid": os.getpid(),
+        "modules_loaded": {name: module.loaded for name, module in HEAVY_MODULES.items()},
+        "llm_client_built": _llm is not None and _llm_pid == os.getpid(),
+    }), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    parse_stats = parse_cache.snapshot()
+    lines += ["# HELP resume_ai_parse_cache_events_total Parse cache lookups and writes by result.", "# TYPE resume_ai_parse_cache_events_total counter"]
+    lines += [f'resume_ai_parse_cache_events_total{{result="{k}"}} {parse_stats[k]}' for k in ("memory_hits", "disk_hits", "misses", "stores", "evictions")]
+    llm_stats = response_cache_snapshot()["functions"]
+    lines += ["# HELP resume_ai_llm_cache_events_total LLM response cache lookups and writes by function and result.", "# TYPE resume_ai_llm_cache_events_total counter"]
+    lines += [f'resume_ai_llm_cache_events_total{{function="{fn}",result="{k}"}} {stats[k]}' for fn, stats in sorted(llm_stats.items()) for k in ("hits", "misses", "stores")]
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+@app.route('/llm_governor_stats', methods=['GET'])
+def get_llm_governor_stats():
+    return jsonify(governor.snapshot())
+
+@app.route('/parse_cache_stats', methods=['GET'])
+def get_parse_cache_stats():
+    return jsonify(parse_cache.snapshot())
+
+@app.route('/llm_cache_stats', methods=['GET'])
+def get_llm_cache_stats():
+    return jsonify(response_cache_snapshot())
+
 @app.route('/resume_check', methods=['POST'])
 def api_resume_check():
-    return jsonify({"output": resume_check_content(request.get_json().get('resume_text'))})
+    # jd_text is optional here; when given in combined mode the check comes from the consolidated analysis
+    data = request.get_json()
+    return jsonify({"output": analysis_output("resume_check", data.get('resume_text'), data.get('jd_text'))})
 
 @app.route('/jd_match', methods=['POST'])
 def api_jd_match():
     data = request.get_json()
-    return jsonify({"output": jd_match_content(data.get('resume_text'), data.get('jd_text'))})
+    return jsonify({"output": analysis_output("jd_match", data.get('resume_text'), data.get('jd_text'))})
 
 @app.route('/generate_questions', methods=['POST'])
 def api_generate_questions():
     data = request.get_json()
-    return jsonify({"output": generate_questions_content(data.get('resume_text'), data.get('jd_text'))})
+    return jsonify({"output": analysis_output("generate_questions", data.get('resume_text'), data.get('jd_text'))})
 
 @app.route('/fit_score', methods=['POST'])
 def api_fit_score():
     data = request.get_json()
-    return jsonify({"output": fit_score_content(data.get('resume_text'), data.get('jd_text'))})
+    return jsonify({"output": analysis_output("fit_score", data.get('resume_text'), data.get('jd_text'))})
+
+@app.route('/resume_check/stream', methods=['POST'])
+def api_resume_check_stream():
+    return sse_analysis_response("resume_check", request.get_json() or {})
+
+@app.route('/jd_match/stream', methods=['POST'])
+def api_jd_match_stream():
+    return sse_analysis_response("jd_match", request.get_json() or {})
+
+@app.route('/generate_questions/stream', methods=['POST'])
+def api_generate_questions_stream():
+    return sse_analysis_response("generate_questions", request.get_json() or {})
+
+@app.route('/fit_score/stream', methods=['POST'])
+def api_fit_score_stream():
+    return sse_analysis_response("fit_score", request.get_json() or {})
+
+@app.route('/analyze', methods=['POST'])
+def api_analyze():
+    """
+    One-shot screening: {"resume_text", "jd_text", optional "tasks": [...], optional "timeout": seconds}.
+    Returns every finished analysis under "results" and failures/timeouts under "errors".
+    """
+    data = request.get_json() or {}
+    resume_text, jd_text = data.get('resume_text'), data.get('jd_text')
+    if not resume_text or not jd_text:
+        return jsonify({"error": "Please parse a resume and provide a job description."}), 400
+    task_names = data.get('tasks') or list(ANALYSIS_TASKS)
+    if not isinstance(task_names, list):
+        return jsonify({"error": "tasks must be a list of analysis names"}), 400
+    unknown = [name for name in task_names if not isinstance(name, str) or name not in ANALYSIS_TASKS]
+    if unknown:
+        return jsonify({"error": f"Unknown analysis tasks: {', '.join(map(str, unknown))}"}), 400
+    try:
+        timeout = float(data.get('timeout', ANALYSIS_TASK_TIMEOUT))
+    except (TypeError, ValueError):
+        timeout = None
+    # gevent treats a negative timeout as "no timeout", so only positive values may tighten the cap
+    if timeout is None or not math.isfinite(timeout) or timeout <= 0:
+        return jsonify({"error": "timeout must be a positive number of seconds"}), 400
+    timeout = min(timeout, ANALYSIS_TASK_TIMEOUT)
+    results, errors = run_analyses(resume_text, jd_text, task_names, timeout)
+    return jsonify({"results": results, "errors": errors, "partial": bool(errors)})
+
+@app.route('/batch_jobs', methods=['POST'])
+def api_create_batch_job():
+    """
+    Multipart upload of PDFs and/or zips under `resumes`, plus `jd_role` or `jd_text`,
+    `auto_confirm` and `include_questions` flags. Returns a job ID to poll.
+    """
+    request.max_content_length = MAX_BATCH_REQUEST_BYTES
+    files = [f for f in request.files.getlist('resumes') if f.filename]
+    if not files: return jsonify({"error": "No resume files provided"}), 400
+    jd_role = request.form.get('jd_role', '')
+    jd_text = request.form.get('jd_text') or JD_OPTIONS.get(jd_role, '')
+    flag = lambda name: request.form.get(name, 'false').lower() in ('1', 'true', 'yes')
+    try:
+        job_id, total = create_batch_job(files, jd_role, jd_text, flag('auto_confirm'), flag('include_questions'))
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({"error": f"Invalid batch upload: {e}"}), 400
+    return jsonify({"job_id": job_id, "total": total}), 202
+
+@app.route('/batch_jobs/<job_id>', methods=['GET'])
+def api_get_batch_job(job_id):
+    job = get_batch_job(job_id)
+    if job is None: return jsonify({"error": "Batch job not found"}), 404
+    return jsonify(job)
+
+@app.route('/fit_score_batch', methods=['POST'])
+def api_fit_score_batch():
+    """
+    Scores one resume against many JDs: {"resume_text", optional "roles": [...] (default: every JD_OPTIONS role),
+    optional "jds": {role: jd_text} for custom JDs, optional "mode": "parallel" | "single"}.
+    Returns the roles ranked by numeric score.
+    """
+    data = request.get_json() or {}
+    resume_text = data.get('resume_text')
+    if not resume_text:
+        return jsonify({"error": "Please parse a resume first."}), 400
+    custom_jds = data.get('jds') or {}
+    roles = data.get('roles') or ([] if custom_jds else list(JD_OPTIONS))
+    if not isinstance(roles, list) or not all(isinstance(role, str) for role in roles) or not isinstance(custom_jds, dict):
+        return jsonify({"error": "roles must be a list of role names and jds an object of role -> JD text"}), 400
+    unknown = [role for role in roles if role not in JD_OPTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown roles: {', '.join(map(str, unknown))}"}), 400
+    jds = {role: JD_OPTIONS[role] for role in roles}
+    jds.update({str(role): str(text) for role, text in custom_jds.items() if text})
+    if not jds or len(jds) > FIT_SCORE_BATCH_MAX_JDS:
+        return jsonify({"error": f"Provide between 1 and {FIT_SCORE_BATCH_MAX_JDS} job descriptions"}), 400
+    mode = data.get('mode', 'parallel')
+    if mode not in ('parallel', 'single'):
+        return jsonify({"error": "mode must be 'parallel' or 'single'"}), 400
+    return jsonify({"mode": mode, "ranking": score_resume_against_jds(resume_text, jds, mode)})
+
+@app.route('/rank_candidates', methods=['POST'])
+def api_rank_candidates():
+    """
+    Ranks saved resumes against {"jd_text"} or {"jd_role"} using the local index.
+    Optional: "top_k" (default 20), "role" to restrict to resumes saved for that role,
+    "rerank" = N to re-score the top N with the model. A resume saved for several roles is one
+    candidate (its newest entry) with every role in "saved_roles".
+    """
+    data = request.get_json() or {}
+    jd_text = data.get('jd_text') or JD_OPTIONS.get(data.get('jd_role'), '')
+    if not jd_text:
+        return jsonify({"error": "Provide jd_text or a known jd_role."}), 400
+    try:
+        top_k = max(1, min(int(data.get('top_k', 20)), 500))
+        rerank = max(0, min(int(data.get('rerank', 0)), RANK_RERANK_MAX))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k and rerank must be integers"}), 400
+    with stage_timer("rank_query"):
+        ranked = rank_candidates(jd_text, top_k, data.get('role'))
+    with closing(metadata_db()) as conn:
+        rows = {row["id"]: dict(row) for row in conn.execute(
+            f"SELECT id, person_name, jd_role, fit_score, resume_filename, qa_filename, timestamp FROM resumes WHERE id IN ({', '.join('?' * len(ranked))})",
+            [resume_id for resume_id, _, _, _ in ranked]).fetchall()} if ranked else {}
+    candidates = [{**rows[resume_id], "score": round(score, 4), "matched_terms": terms, "saved_roles": roles}
+                  for resume_id, score, terms, roles in ranked if resume_id in rows]
+    if rerank and candidates:
+        candidates = rerank_with_llm(candidates[:rerank], jd_text) + candidates[rerank:]
+    return jsonify({"candidates": candidates})
 
 @app.route('/generate_resume_table', methods=['POST'])
 def api_generate_resume_table():
@@ -428,62 +2925,89 @@ def confirm_document():
     if not all(k in data for k in required_keys):
         return jsonify({"error": "Missing required data for confirmation"}), 400
 
-    entry_id = str(uuid.uuid4())
-    filename_base, file_ext = os.path.splitext(data['original_file_name'])
-    saved_resume_filename_unique = f"{entry_id}_{secure_filename(filename_base)}{file_ext}"
-    saved_qa_filename = f"{entry_id}_qa.md"
-    temp_resume_source_path = os.path.join(UPLOAD_FOLDER, data['temp_saved_filename'])
-    
-    if os.path.exists(temp_resume_source_path):
-        shutil.move(temp_resume_source_path, os.path.join(SAVED_RESUMES_DIR, saved_resume_filename_unique))
-    else:
+    try:
+        entry_id = save_confirmed_resume(
+            temp_upload_key(data['temp_saved_filename']), data['original_file_name'], data['parsed_resume_name'],
+            data['selected_jd_role'], data['fit_score_output'], data['interview_qa_output'], data.get('timestamp'),
+            resume_json=data['resume_text_cache'])
+    except FileNotFoundError:
         return jsonify({"error": "Temporary resume file not found on server."}), 500
-
-    with open(os.path.join(SAVED_RESUMES_DIR, saved_qa_filename), 'w', encoding='utf-8') as f:
-        f.write(data['interview_qa_output'])
-    
-    metadata = load_metadata()
-    metadata.append({
-        "id": entry_id, "person_name": data['parsed_resume_name'], "jd_role": data['selected_jd_role'],
-        "fit_score": data['fit_score_output'], "resume_filename": saved_resume_filename_unique,
-        "qa_filename": saved_qa_filename, "timestamp": data.get('timestamp')
-    })
-    save_metadata(metadata)
     return jsonify({"message": "Document confirmed and saved!", "id": entry_id}), 200
 
 @app.route('/get_saved_resumes', methods=['GET'])
 def get_saved_resumes():
+    """
+    Lists saved resumes filtered by role and sorted by timestamp, person_name or fit_score.
+    Without `limit` the full list is returned (as before); with `limit` the response is
+    {"items": [...], "next_cursor": ...} and `cursor` fetches the following page.
+    """
     args = request.args
-    metadata = load_metadata()
-    if args.get('role') and args.get('role') != 'All Roles':
-        metadata = [r for r in metadata if r.get('jd_role') == args.get('role')]
+    try:
+        limit = int(args['limit']) if args.get('limit') else None
+        with stage_timer("metadata_query"):
+            entries, next_cursor = query_metadata(
+                role=args.get('role'), sort_key=args.get('sort_key', 'timestamp'), sort_order=args.get('sort_order', 'desc'),
+                limit=max(1, min(limit, 500)) if limit else None, cursor=args.get('cursor'))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+    if limit:
+        return jsonify({"items": entries, "next_cursor": next_cursor})
+    return jsonify(entries)
 
-    sort_key = args.get('sort_key', 'timestamp')
-    reverse = args.get('sort_order', 'desc') == 'desc'
-    
-    def get_score_value(entry):
-        try: return float(re.search(r'(\d+(\.\d+)?)', entry.get('fit_score', '0')).group(1))
-        except: return 0.0
-    
-    if sort_key == 'fit_score':
-        metadata.sort(key=get_score_value, reverse=reverse)
-    elif sort_key == 'person_name':
-        metadata.sort(key=lambda x: x.get('person_name', '').lower(), reverse=reverse)
+def export_filters(args):
+    return {
+        "role": args.get('role'), "since": args.get('since'), "until": args.get('until'),
+        "after": int(args.get('after') or 0), "limit": int(args['limit']) if args.get('limit') else None,
+    }
+
+@app.route('/export/candidates', methods=['GET'])
+def export_candidates():
+    """
+    Streams saved candidate metadata as NDJSON (default) or CSV (`format=csv`).
+    Filters: role, since/until (ISO timestamps), limit; `after=<seq>` resumes after the last record received.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+    try:
+        filters = export_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid export parameters: {e}"}), 400
+    rows = iter_export_rows(**filters)
+    if export_format == 'csv':
+        body, mimetype = export_csv(rows), 'text/csv'
     else:
-        metadata.sort(key=lambda x: x.get(sort_key, ''), reverse=reverse)
-        
-    return jsonify(metadata)
+        body, mimetype = export_ndjson(rows), 'application/x-ndjson'
+    return Response(body, mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="candidates.{export_format}"', "X-Accel-Buffering": "no"})
+
+@app.route('/export/archive', methods=['GET'])
+def export_archive_route():
+    """Streams a zip of metadata.ndjson, resumes/ and interview_qa/ for the candidates matching the export filters."""
+    try:
+        filters = export_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid export parameters: {e}"}), 400
+    return Response(export_archive(lambda max_seq: iter_export_rows(**filters, max_seq=max_seq)), mimetype='application/zip',
+                    headers={"Content-Disposition": 'attachment; filename="candidates.zip"', "X-Accel-Buffering": "no"})
 
 @app.route('/download_resume/<filename>', methods=['GET'])
 def download_resume(filename):
-    return send_from_directory(SAVED_RESUMES_DIR, secure_filename(filename), as_attachment=True)
+    filename = secure_filename(filename)
+    response = artifact_response(filename, as_attachment=True)
+    if response is not None:
+        return response
+    return send_from_directory(os.path.abspath(SAVED_RESUMES_DIR), filename, as_attachment=True)  # Saved before the blob store existed
 
 @app.route('/get_interview_qa/<filename>', methods=['GET'])
 def get_interview_qa(filename):
-    path = os.path.join(SAVED_RESUMES_DIR, secure_filename(filename))
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return jsonify({"qa_content": f.read()})
+    """Returns the Q&A Markdown itself (text/markdown), with the same caching headers as downloads."""
+    filename = secure_filename(filename)
+    response = artifact_response(filename)
+    if response is not None:
+        return response
+    if os.path.exists(os.path.join(SAVED_RESUMES_DIR, filename)):
+        return send_from_directory(os.path.abspath(SAVED_RESUMES_DIR), filename, mimetype="text/markdown")
     return jsonify({"error": "QA file not found"}), 404
 
 @app.route('/clear_all_data', methods=['POST'])
@@ -493,19 +3017,18 @@ def clear_all_data():
             if os.path.exists(folder):
                 for filename in os.listdir(folder):
                     os.remove(os.path.join(folder, filename))
-        with open(METADATA_DB_FILE, 'w') as f:
-            json.dump([], f)
+        storage.delete_prefix(UPLOAD_FOLDER)
+        clear_metadata()
+        clear_blob_store()
+        clear_batch_jobs()
+        clear_rank_index()
+        parse_cache.clear()
+        if response_cache is not None: response_cache.clear()
         return jsonify({"message": "All data cleared successfully!"}), 200
     except Exception as e:
         return jsonify({"error": f"Failed to clear all data: {e}"}), 500
 
 if __name__ == "__main__":
-    if os.path.exists(UPLOAD_FOLDER):
-        for filename in os.listdir(UPLOAD_FOLDER):
-            try:
-                os.remove(os.path.join(UPLOAD_FOLDER, filename))
-            except Exception as e:
-                print(f"Error cleaning up old temp file: {e}")
-
+    create_app()
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,220 @@
+"""
+Load-test benchmark for the backend.
+
+Starts app.py under gunicorn with gevent workers and the fake LLM provider (LLM_PROVIDER=fake),
+drives every route with concurrent clients and reports throughput and p50/p95/p99 latency per
+route. Because the model is a local stand-in with fixed latency, the numbers measure the
+server's own overhead and are comparable between runs. The LLM governor's per-worker limits
+(token bucket and concurrency caps) are switched off for the same reason; they model the
+provider's quota, not server cost.
+
+    python benchmark.py --workers 2 --concurrency 32 --requests 200 --json bench.json
+    python benchmark.py --url http://127.0.0.1:10000   # against an already running server
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import fitz  # PyMuPDF
+import gevent
+from gevent.pool import Pool
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Rate <= 0 disables the token bucket; the concurrency caps are set far above any --concurrency
+GOVERNOR_UNLIMITED_ENV = {"LLM_RATE_PER_SECOND_PER_WORKER": "0", "LLM_MAX_CONCURRENCY_PER_WORKER": "100000",
+                          "LLM_TASK_MAX_CONCURRENCY_PER_WORKER": "100000"}
+JD_TEXT = "Experience with Python, Flask, SQL and REST APIs. Docker and cloud deployment are a plus."
+
+
+def make_resume_pdf(nonce):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "\n".join([
+        "Jane Doe", "jane.doe@example.com | +1 555 123 4567", f"Reference {nonce}",
+        "Experience: Software Engineer, Acme Corp (2020 - Present)",
+        *[f"- Built and operated Python/Flask service number {i} backed by SQL." for i in range(12)],
+        "Skills: Python, Flask, SQL, Docker, Git, React",
+    ]), fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def multipart_body(field, filename, payload):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def timed_request(url, body=None, content_type="application/json", timeout=120):
+    """Returns (latency_seconds, status, parsed_json_or_None)."""
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type} if body is not None else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            raw, status = resp.read(), resp.status
+    except urllib.error.HTTPError as e:
+        raw, status = e.read(), e.code
+    except OSError:
+        return time.perf_counter() - start, 0, None
+    latency = time.perf_counter() - start
+    try:
+        return latency, status, json.loads(raw)
+    except ValueError:
+        return latency, status, None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))  # Nearest-rank method
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def run_phase(name, make_request, total, concurrency):
+    latencies, errors, results = [], 0, []
+    pool = Pool(concurrency)
+
+    def one(i):
+        nonlocal errors
+        latency, status, payload = make_request(i)
+        latencies.append(latency)
+        if not 200 <= status < 300:
+            errors += 1
+        results.append(payload)
+
+    start = time.perf_counter()
+    for i in range(total):
+        pool.spawn(one, i)
+    pool.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "route": name, "requests": total, "errors": errors, "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }, results
+
+
+def run_benchmark(base_url, total, concurrency, use_cache):
+    post = lambda path, payload: timed_request(f"{base_url}{path}", json.dumps(payload).encode())
+    # Unless caching is being measured, every request carries unique inputs so no cache can answer it.
+    suffix = (lambda i: "") if use_cache else (lambda i: f"\nRef: {uuid.uuid4().hex}")
+    pdfs = [make_resume_pdf("bench" if use_cache else uuid.uuid4().hex) for _ in range(total)]
+    resume_text = json.dumps({"name": "Jane Doe", "skills": {"Programming Languages": ["Python", "SQL"]}})
+    report = []
+
+    def phase(name, make_request):
+        stats, results = run_phase(name, make_request, total, concurrency)
+        report.append(stats)
+        return results
+
+    phase("GET /jd_options", lambda i: timed_request(f"{base_url}/jd_options"))
+    parsed = phase("POST /parse_resume", lambda i: timed_request(
+        f"{base_url}/parse_resume", *multipart_body("resume", f"bench_{i}.pdf", pdfs[i])))
+    phase("POST /resume_check", lambda i: post("/resume_check", {"resume_text": resume_text + suffix(i)}))
+    phase("POST /jd_match", lambda i: post("/jd_match", {"resume_text": resume_text + suffix(i), "jd_text": JD_TEXT}))
+    phase("POST /generate_questions", lambda i: post("/generate_questions", {"resume_text": resume_text + suffix(i), "jd_text": JD_TEXT}))
+    phase("POST /fit_score", lambda i: post("/fit_score", {"resume_text": resume_text + suffix(i), "jd_text": JD_TEXT}))
+    phase("POST /analyze", lambda i: post("/analyze", {"resume_text": resume_text + suffix(i), "jd_text": JD_TEXT}))
+
+    uploads = [p for p in parsed if p and p.get("temp_saved_filename")]
+    def confirm(i):
+        if i >= len(uploads):
+            return 0.0, 0, None
+        upload = uploads[i]
+        return post("/confirm_document", {
+            "resume_text_cache": upload.get("raw_parsed_text", ""), "jd_text": JD_TEXT, "fit_score_output": "Score: 7.5/10",
+            "interview_qa_output": "## Technical Interview Questions", "selected_jd_role": "Software Engineer",
+            "original_file_name": upload.get("original_filename", "bench.pdf"), "temp_saved_filename": upload["temp_saved_filename"],
+            "parsed_resume_name": upload.get("extracted_name", "Jane Doe"), "timestamp": f"2025-01-01T00:00:{i % 60:02d}.000Z"})
+    phase("POST /confirm_document", confirm)
+    phase("GET /get_saved_resumes", lambda i: timed_request(f"{base_url}/get_saved_resumes?sort_key=fit_score&sort_order=desc&limit=50"))
+    return report
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, workers, latency_ms, jitter_ms, error_rate, use_cache):
+    port = free_port()
+    env = dict(os.environ, LLM_PROVIDER="fake", FAKE_LLM_LATENCY_MS=str(latency_ms), FAKE_LLM_JITTER_MS=str(jitter_ms),
+               FAKE_LLM_ERROR_RATE=str(error_rate), FAKE_LLM_SEED="42", LLM_CACHE_BACKEND="memory" if use_cache else "none",
+               **GOVERNOR_UNLIMITED_ENV)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+         "--pythonpath", BACKEND_DIR, "--log-level", "warning", "app:app"],
+        cwd=workdir, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        _, status, _ = timed_request(f"{base_url}/jd_options", timeout=2)
+        if status == 200:
+            return proc, base_url
+        gevent.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not become ready within 60s")
+
+
+def print_report(report):
+    header = f"{'route':<28}{'reqs':>6}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in report:
+        print(f"{row['route']:<28}{row['requests']:>6}{row['errors']:>8}{row['throughput_rps']:>10}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn gevent workers")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--latency-ms", type=float, default=800, help="fake model latency")
+    parser.add_argument("--jitter-ms", type=float, default=200, help="fake model latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake model calls that fail")
+    parser.add_argument("--cache", action="store_true", help="repeat identical inputs and leave the LLM cache on")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    proc = None
+    with tempfile.TemporaryDirectory(prefix="resume_ai_bench_") as workdir:
+        try:
+            if args.url:
+                base_url = args.url.rstrip("/")
+            else:
+                proc, base_url = start_server(workdir, args.workers, args.latency_ms, args.jitter_ms, args.error_rate, args.cache)
+            report = run_benchmark(base_url, args.requests, args.concurrency, args.cache)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "routes": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Shared pytest setup: the app is imported once with the fake LLM provider and without an API
+key, and every test gets its own working directory so uploads, blobs and the metadata DB
+start empty.
+"""
+import os
+
+os.environ.pop("GOOGLE_API_KEY", None)
+os.environ.update(LLM_PROVIDER="fake", FAKE_LLM_LATENCY_MS="0", FAKE_LLM_JITTER_MS="0", FAKE_LLM_ERROR_RATE="0",
+                  LLM_CACHE_BACKEND="none", STORAGE_BACKEND="local")
+
+import fitz  # noqa: E402
+import pytest  # noqa: E402
+
+import app as resume_app  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_background_greenlets(monkeypatch):
+    """Keeps the batch dispatcher and reaper from starting, so tests drive batch items themselves."""
+    monkeypatch.setattr(resume_app, "_runtime_pid", os.getpid())
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test from an empty directory with freshly created stores."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(resume_app, "_storage_ready", False)
+    resume_app.create_app(warm=False)
+    resume_app.parse_cache.clear()
+    return tmp_path
+
+
+@pytest.fixture
+def client(workdir):
+    return resume_app.app.test_client()
+
+
+@pytest.fixture
+def resume_pdf():
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "\n".join([
+        "Jane Doe", "jane.doe@example.com | +1 555 123 4567",
+        "Experience: Software Engineer, Acme Corp (2020 - Present)",
+        *[f"- Built and operated Python/Flask service number {i} backed by SQL." for i in range(12)],
+        "Skills: Python, Flask, SQL, Docker, Git, React",
+    ]), fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
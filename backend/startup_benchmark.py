@@ -0,0 +1,114 @@
+"""
+Startup-time benchmark for the backend.
+
+Uses the fake LLM provider with no API key set and reports:
+  * import        - `import app` in a fresh interpreter
+  * import+warm   - `import app` plus loading the lazily imported modules (PyMuPDF, Pillow, google-genai)
+  * boot_ready    - per gunicorn startup mode, time from launch until /readyz answers 200
+  * first_parse   - latency of the first /parse_resume served by a freshly booted server
+
+    python startup_benchmark.py --runs 5 --workers 2 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark import BACKEND_DIR, free_port, make_resume_pdf, multipart_body, timed_request
+
+IMPORT_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {backend!r}); start = time.perf_counter(); import app; {extra}"
+    "print(time.perf_counter() - start)"
+)
+STARTUP_MODES = {
+    "app:app": ([], "app:app", {}),
+    "factory": ([], "app:create_app()", {}),
+    "factory+preload+warm": (["--preload"], "app:create_app()", {"STARTUP_WARM_IMPORTS": "1"}),
+}
+
+
+def bench_env(**extra):
+    env = {k: v for k, v in os.environ.items() if k != "GOOGLE_API_KEY"}
+    env.update(LLM_PROVIDER="fake", FAKE_LLM_LATENCY_MS="0", FAKE_LLM_JITTER_MS="0", **extra)
+    return env
+
+
+def summarize(samples):
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1),
+            "max_ms": round(max(samples) * 1000, 1), "runs": len(samples)}
+
+
+def measure_import(runs, warm):
+    samples = []
+    snippet = IMPORT_SNIPPET.format(backend=BACKEND_DIR, extra="app.warm_imports(); " if warm else "")
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="resume_ai_startup_") as workdir:
+            out = subprocess.run([sys.executable, "-c", snippet], cwd=workdir, env=bench_env(),
+                                 capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return summarize(samples)
+
+
+def measure_boot(mode, workers):
+    """Returns (seconds until /readyz is 200, first /parse_resume latency in seconds)."""
+    flags, target, extra_env = STARTUP_MODES[mode]
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="resume_ai_startup_") as workdir:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+             "--pythonpath", BACKEND_DIR, "--log-level", "warning", *flags, target],
+            cwd=workdir, env=bench_env(**extra_env))
+        try:
+            deadline = start + 60
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"gunicorn exited during startup ({mode})")
+                _, status, _ = timed_request(f"{base_url}/readyz", timeout=2)
+                if status == 200:
+                    ready = time.perf_counter() - start
+                    break
+                if time.perf_counter() > deadline:
+                    raise RuntimeError(f"gunicorn did not become ready within 60s ({mode})")
+                time.sleep(0.01)
+            first_parse, status, _ = timed_request(
+                f"{base_url}/parse_resume", *multipart_body("resume", "startup.pdf", make_resume_pdf("startup")))
+            if status != 200:
+                raise RuntimeError(f"/parse_resume returned {status} ({mode})")
+            return ready, first_parse
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="repetitions per measurement")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn gevent workers")
+    parser.add_argument("--modes", nargs="+", default=list(STARTUP_MODES), choices=list(STARTUP_MODES))
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = {"import": measure_import(args.runs, warm=False), "import+warm": measure_import(args.runs, warm=True), "modes": {}}
+    for mode in args.modes:
+        samples = [measure_boot(mode, args.workers) for _ in range(args.runs)]
+        report["modes"][mode] = {"boot_ready": summarize([s[0] for s in samples]), "first_parse": summarize([s[1] for s in samples])}
+
+    print(f"{'measurement':<44}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    rows = [("import", report["import"]), ("import+warm", report["import+warm"])]
+    for mode, stats in report["modes"].items():
+        rows += [(f"{mode} boot_ready", stats["boot_ready"]), (f"{mode} first_parse", stats["first_parse"])]
+    for name, stats in rows:
+        print(f"{name:<44}{stats['median_ms']:>12}{stats['min_ms']:>10}{stats['max_ms']:>10}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
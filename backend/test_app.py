@@ -0,0 +1,269 @@
+"""
+Backend tests. They run against the fake LLM provider (see conftest.py), so no API key or
+network access is needed:
+
+    cd backend && python -m pytest -q
+"""
+import io
+import json
+
+import gevent
+import pytest
+
+import app as resume_app
+
+
+# --- JSON repair ---
+@pytest.mark.parametrize("text, expected", [
+    ('{"name": "Jane"}', {"name": "Jane"}),
+    ('Here you go:\n```json\n{"name": "Jane"}\n```\nAnything else?', {"name": "Jane"}),
+    ('```\n{"name": "Jane"}', {"name": "Jane"}),
+    ('{"skills": ["Python", "SQL",], "name": "Jane",}', {"skills": ["Python", "SQL"], "name": "Jane"}),
+    ('{“name”: “Jane”}', {"name": "Jane"}),
+    ('Sure! {"name": "Jane"} Hope that helps.', {"name": "Jane"}),
+    ('{"name": "Jane", "skills": ["Python", "Fla', {"name": "Jane", "skills": ["Python", "Fla"]}),
+])
+def test_repair_json_near_misses(text, expected):
+    assert resume_app.repair_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", None, "no json here", "{not: json at all"])
+def test_repair_json_rejects_garbage(text):
+    with pytest.raises(ValueError):
+        resume_app.repair_json(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2', '{"a": [1, 2]}'),
+    ('{"a": "unterminated', '{"a": "unterminated"}'),
+    ('{"a": 1,', '{"a": 1}'),
+    ('{"a": {"b": [', '{"a": {"b": []}}'),
+    ('{"a": "brace } and \\" quote', '{"a": "brace } and \\" quote"}'),
+    ('{"a": 1}', '{"a": 1}'),
+])
+def test_close_truncated_json(text, expected):
+    closed = resume_app.close_truncated_json(text)
+    assert closed == expected
+    json.loads(closed)
+
+
+# --- ResumeRecord coercions ---
+def test_resume_record_coerces_loose_values():
+    record = resume_app.parse_resume_record(json.dumps({
+        "name": None, "phone": 5551234567,
+        "education": {"degree": "B.S.", "years": 2020},
+        "experience": [{"title": "Engineer", "responsibilities": "Built APIs"}],
+        "projects": None,
+        "skills": [{"category": "Languages", "items": ["Python"]}, {"category": "", "items": ["Git"]}],
+    })).model_dump()
+    assert record["name"] == "" and record["email"] == ""
+    assert record["phone"] == "5551234567"
+    assert record["education"] == [{"degree": "B.S.", "institution": "", "years": "2020", "location": ""}]
+    assert record["experience"][0]["responsibilities"] == ["Built APIs"]
+    assert record["projects"] == []
+    assert record["skills"] == {"Languages": ["Python"], "Skills": ["Git"]}
+
+
+@pytest.mark.parametrize("skills, expected", [
+    ("Python, SQL", {"Skills": ["Python, SQL"]}),
+    (["Python", "SQL"], {"Skills": ["Python", "SQL"]}),
+    ({"Tools": "Git"}, {"Tools": ["Git"]}),
+    (None, {}),
+])
+def test_resume_record_skills_shapes(skills, expected):
+    assert resume_app.parse_resume_record(json.dumps({"skills": skills})).skills == expected
+
+
+def test_resume_record_rejects_wrong_types():
+    with pytest.raises(ValueError):
+        resume_app.parse_resume_record('{"education": 5}')
+    with pytest.raises(ValueError):
+        resume_app.parse_resume_record('["not", "an", "object"]')
+
+
+# --- Resume table ---
+@pytest.mark.parametrize("cache, expected_rows", [
+    (json.dumps(resume_app.FakeProvider.RESUME_JSON), ["| **Name** | Jane Doe |", "| **Email** | jane.doe@example.com |"]),
+    (json.dumps({"raw_text_fallback": '```json\n{"name": "Jane", "email": "j@example.com",}\n```'}), ["| **Name** | Jane |"]),
+    (json.dumps({"raw_text_fallback": "model said | no"}), ["| **Raw Output** | model said \\| no |"]),
+    ("not json at all", ["| **Raw Output** | not json at all |"]),
+])
+def test_generate_resume_table(client, cache, expected_rows):
+    response = client.post("/generate_resume_table", json={"resume_text_cache": cache})
+    assert response.status_code == 200
+    table = response.json["output"].splitlines()
+    assert table[:2] == ["| Category | Details |", "|---|---|"]
+    for row in expected_rows:
+        assert row in table
+
+
+# --- Parse -> confirm -> list -> download ---
+def confirm_payload(parsed, role="Data Scientist"):
+    return {
+        "resume_text_cache": parsed["raw_parsed_text"], "jd_text": "Python, SQL", "fit_score_output": "Score: 7.5/10",
+        "interview_qa_output": "## Technical Interview Questions\n| Question | Best Answer |", "selected_jd_role": role,
+        "original_file_name": parsed["original_filename"], "temp_saved_filename": parsed["temp_saved_filename"],
+        "parsed_resume_name": parsed["extracted_name"], "timestamp": "2025-01-01T00:00:00.000Z",
+    }
+
+
+def test_parse_confirm_list_download(client, resume_pdf):
+    response = client.post("/parse_resume", data={"resume": (io.BytesIO(resume_pdf), "jane.pdf")})
+    assert response.status_code == 200
+    parsed = response.json
+    assert parsed["extracted_name"] == "Jane Doe"
+    assert json.loads(parsed["raw_parsed_text"])["email"] == "jane.doe@example.com"
+
+    payload = confirm_payload(parsed)
+    response = client.post("/confirm_document", json=payload)
+    assert response.status_code == 200
+    assert not resume_app.storage.exists(resume_app.temp_upload_key(parsed["temp_saved_filename"]))
+
+    entries = client.get("/get_saved_resumes").json
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry["person_name"] == "Jane Doe" and entry["jd_role"] == "Data Scientist"
+
+    download = client.get(f"/download_resume/{entry['resume_filename']}")
+    assert download.status_code == 200
+    assert download.data == resume_pdf
+    assert download.headers["Content-Type"] == "application/pdf"
+    assert client.get(f"/download_resume/{entry['resume_filename']}", headers={"If-None-Match": download.headers["ETag"]}).status_code == 304
+
+    qa = client.get(f"/get_interview_qa/{entry['qa_filename']}")
+    assert qa.status_code == 200
+    assert qa.headers["Content-Type"] == "text/markdown; charset=utf-8"
+    assert qa.get_data(as_text=True) == payload["interview_qa_output"]
+
+
+def test_confirm_without_upload_is_rejected(client, resume_pdf):
+    parsed = client.post("/parse_resume", data={"resume": (io.BytesIO(resume_pdf), "jane.pdf")}).json
+    payload = confirm_payload(parsed)
+    payload["temp_saved_filename"] = "missing.pdf"
+    assert client.post("/confirm_document", json=payload).status_code == 500
+    assert client.get("/get_saved_resumes").json == []
+
+
+def test_corrupt_pdf_error_hides_server_paths(client):
+    response = client.post("/parse_resume", data={"resume": (io.BytesIO(b"%PDF-1.7\nnot really a pdf"), "bad.pdf")})
+    assert response.status_code == 422
+    assert resume_app.UPLOAD_FOLDER not in response.json["error"]
+
+
+def test_batch_item_is_confirmed_from_the_spool(client, resume_pdf):
+    response = client.post("/batch_jobs", data={"resumes": [(io.BytesIO(resume_pdf), "jane.pdf")], "jd_role": "Data Scientist",
+                                                "auto_confirm": "true"})
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+    resume_app.process_batch_item(*resume_app.claim_batch_item())
+    job = client.get(f"/batch_jobs/{job_id}").json
+    assert job["status"] == "completed" and job["counts"]["done"] == 1
+    assert list(resume_app.storage.list(resume_app.BATCH_UPLOAD_DIR)) == []
+    entry = client.get("/get_saved_resumes").json[0]
+    assert client.get(f"/download_resume/{entry['resume_filename']}").data == resume_pdf
+
+
+def test_rank_candidates_collapses_a_resume_saved_for_several_roles(client, resume_pdf):
+    saved_ids = []
+    for role in ["Data Scientist", "Backend Developer", "Data Scientist"]:
+        parsed = client.post("/parse_resume", data={"resume": (io.BytesIO(resume_pdf), "jane.pdf")}).json
+        saved_ids.append(client.post("/confirm_document", json=confirm_payload(parsed, role)).json["id"])
+
+    candidates = client.post("/rank_candidates", json={"jd_text": "Python Flask SQL engineer"}).json["candidates"]
+    assert len(candidates) == 1
+    assert candidates[0]["id"] == saved_ids[-1]
+    assert candidates[0]["saved_roles"] == ["Data Scientist", "Backend Developer"]
+
+    candidates = client.post("/rank_candidates", json={"jd_text": "Python Flask SQL engineer", "role": "Backend Developer"}).json["candidates"]
+    assert [c["id"] for c in candidates] == [saved_ids[1]]
+
+
+@pytest.mark.parametrize("timeout", [-1, 0, "NaN", "soon", None])
+def test_analyze_rejects_timeouts_that_are_not_positive(client, timeout):
+    response = client.post("/analyze", json={"resume_text": "r", "jd_text": "j", "timeout": timeout})
+    assert response.status_code == 400
+
+
+def test_analyze_caps_the_timeout(client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(resume_app, "run_analyses", lambda *args: seen.append(args[-1]) or ({}, {}))
+    assert client.post("/analyze", json={"resume_text": "r", "jd_text": "j", "timeout": 1e9}).status_code == 200
+    assert client.post("/analyze", json={"resume_text": "r", "jd_text": "j", "timeout": 0.5}).status_code == 200
+    assert seen == [resume_app.ANALYSIS_TASK_TIMEOUT, 0.5]
+
+
+@pytest.mark.parametrize("body", [{"roles": [["Data Scientist"]]}, {"roles": [{"role": "x"}]}, {"roles": "Data Scientist"},
+                                  {"jds": ["not", "an", "object"]}, {"roles": ["No Such Role"]}])
+def test_fit_score_batch_rejects_bad_roles(client, body):
+    assert client.post("/fit_score_batch", json={"resume_text": "r", **body}).status_code == 400
+
+
+def test_fit_score_batch_ranks_roles(client):
+    response = client.post("/fit_score_batch", json={"resume_text": "r", "roles": ["Data Scientist"], "jds": {"Custom": "Python"}, "mode": "single"})
+    assert response.status_code == 200
+    assert sorted(item["role"] for item in response.json["ranking"]) == ["Custom", "Data Scientist"]
+
+
+# --- Metadata store ---
+def test_batch_claim_does_not_wait_on_a_locked_db(workdir):
+    with resume_app.closing(resume_app.metadata_db()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        started = resume_app.time.perf_counter()
+        assert resume_app.claim_batch_item() is None
+        assert resume_app.time.perf_counter() - started < 1
+        conn.rollback()
+
+
+# --- LLM governor ---
+def make_governor(max_concurrency=1, task_concurrency=2):
+    return resume_app.LLMGovernor(max_concurrency, task_concurrency, rate=1000, burst=1000, max_retries=0, base_delay=0, max_delay=0)
+
+
+def test_governor_timeout_while_queued_releases_task_slot():
+    governor = make_governor(max_concurrency=1, task_concurrency=2)
+
+    def hold_global_slot():
+        with governor.slot("other"):
+            gevent.sleep(0.2)
+
+    holder = gevent.spawn(hold_global_slot)
+    gevent.sleep(0)
+    for _ in range(2):
+        assert gevent.with_timeout(0.02, governor.call, "fit_score", lambda: "ok", timeout_value="timed out") == "timed out"
+    assert governor.task_slots["fit_score"].counter == 2
+    holder.join()
+    assert governor.call("fit_score", lambda: "ok") == "ok"
+    assert governor.snapshot()["queue_depth"] == {}
+
+
+def test_governor_coalesced_waiters_survive_a_cancelled_caller():
+    governor = make_governor(max_concurrency=4, task_concurrency=4)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        gevent.sleep(0.1)
+        return "shared result"
+
+    impatient = gevent.spawn(gevent.with_timeout, 0.02, governor.call, "fit_score", slow, "key", timeout_value="timed out")
+    gevent.sleep(0)
+    patient = gevent.spawn(governor.call, "fit_score", slow, "key")
+    gevent.joinall([impatient, patient])
+    assert impatient.value == "timed out"
+    assert patient.value == "shared result"
+    assert calls == [1]
+    assert governor.stats["coalesced"] == 1
+    assert governor.in_flight_calls == {}
+
+
+def test_governor_coalesced_waiters_share_errors():
+    governor = make_governor(max_concurrency=4, task_concurrency=4)
+
+    def failing():
+        gevent.sleep(0.05)
+        raise RuntimeError("upstream failed")
+
+    waiters = [gevent.spawn(governor.call, "fit_score", failing, "key") for _ in range(3)]
+    gevent.joinall(waiters)
+    assert [type(w.exception) for w in waiters] == [RuntimeError] * 3
+    assert governor.in_flight_calls == {}
@@ -0,0 +1,88 @@
+"""
+Two-worker tests: each worker has its own working directory (local spool, parse cache), as with
+separate containers, and they share only an S3 bucket (mocked by moto) and the metadata DB file,
+which stays on the local disk of the one host running them all.
+"""
+import io
+
+import pytest
+
+import app as resume_app
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    """Returns a function that switches the app to the named worker and gives back a test client."""
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SECURITY_TOKEN", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setattr(resume_app, "METADATA_DB_FILE", str(tmp_path / "shared" / "resumes_metadata.db"))
+    with moto.mock_aws():
+        boto3.client("s3").create_bucket(Bucket="resume-ai-test")
+        monkeypatch.setattr(resume_app, "storage", resume_app.S3ObjectStore("resume-ai-test", "test/"))
+
+        def switch(name):
+            (tmp_path / name).mkdir(exist_ok=True)
+            monkeypatch.chdir(tmp_path / name)
+            monkeypatch.setattr(resume_app, "_storage_ready", False)
+            resume_app.create_app(warm=False)
+            resume_app.parse_cache.clear()
+            return resume_app.app.test_client()
+        yield switch
+
+
+def local_files(root):
+    return sorted(str(p.relative_to(root)) for p in root.rglob("*") if p.is_file() and "parse_cache" not in p.parts and p.suffix != ".db")
+
+
+def test_parse_on_one_worker_confirm_and_download_on_another(worker, tmp_path, resume_pdf):
+    worker_a = worker("a")
+    parsed = worker_a.post("/parse_resume", data={"resume": (io.BytesIO(resume_pdf), "jane.pdf")}).json
+    assert parsed["extracted_name"] == "Jane Doe"
+    assert local_files(tmp_path / "a") == []
+    assert resume_app.storage.exists(resume_app.temp_upload_key(parsed["temp_saved_filename"]))
+
+    worker_b = worker("b")
+    response = worker_b.post("/confirm_document", json={
+        "resume_text_cache": parsed["raw_parsed_text"], "jd_text": "Python", "fit_score_output": "Score: 8/10",
+        "interview_qa_output": "## Questions", "selected_jd_role": "Data Scientist",
+        "original_file_name": parsed["original_filename"], "temp_saved_filename": parsed["temp_saved_filename"],
+        "parsed_resume_name": parsed["extracted_name"], "timestamp": "2025-01-01T00:00:00.000Z"})
+    assert response.status_code == 200
+    assert list(resume_app.storage.list(resume_app.UPLOAD_FOLDER)) == []
+
+    entry = worker_b.get("/get_saved_resumes").json[0]
+    assert worker_b.get(f"/download_resume/{entry['resume_filename']}").data == resume_pdf
+    assert worker_b.get(f"/get_interview_qa/{entry['qa_filename']}").get_data(as_text=True) == "## Questions"
+    assert local_files(tmp_path / "b") == []
+
+    worker_a = worker("a")
+    assert worker_a.get(f"/download_resume/{entry['resume_filename']}").data == resume_pdf
+
+
+def test_batch_item_uploaded_on_one_worker_is_processed_on_another(worker, tmp_path, resume_pdf):
+    worker_a = worker("a")
+    response = worker_a.post("/batch_jobs", data={"resumes": [(io.BytesIO(resume_pdf), "jane.pdf")], "jd_role": "Data Scientist",
+                                                "auto_confirm": "true"})
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+    assert local_files(tmp_path / "a") == []
+    assert [key for key, _, _ in resume_app.storage.list(f"{resume_app.BATCH_UPLOAD_DIR}/{job_id}")] == [
+        f"{resume_app.BATCH_UPLOAD_DIR}/{job_id}/00000_jane.pdf"]
+
+    worker_b = worker("b")
+    resume_app.process_batch_item(*resume_app.claim_batch_item())
+    job = worker_b.get(f"/batch_jobs/{job_id}").json
+    assert job["status"] == "completed" and job["counts"]["done"] == 1
+    assert list(resume_app.storage.list(resume_app.BATCH_UPLOAD_DIR)) == []
+    assert local_files(tmp_path / "b") == []
+
+    worker_a = worker("a")
+    entry = worker_a.get("/get_saved_resumes").json[0]
+    assert entry["id"] == job["items"][0]["saved_id"]
+    assert worker_a.get(f"/download_resume/{entry['resume_filename']}").data == resume_pdf
+    assert worker_a.post("/clear_all_data").status_code == 200
+    assert list(resume_app.storage.list("")) == []
@@ -9,6 +9,56 @@ import LoaderGif from './load.gif'; // Make sure this path is correct
 // Use environment variable for the API URL, with a fallback for local development
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://127.0.0.1:5000/api'; 
 
+// POSTs to one of the `/<analysis>/stream` SSE routes and calls onText with the text received so far
+// after every chunk. Resolves with the full text on the `done` event; rejects on an `error` event or
+// if the stream ends early. (EventSource only does GET, so the stream is read from fetch directly.)
+const streamAnalysis = async (path, body, onText) => {
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.error || `HTTP error! status: ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let eventName = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) eventName = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue; // Comments such as ": stream open"
+      const payload = JSON.parse(data);
+      if (eventName === 'error') {
+        reader.cancel();
+        throw new Error(payload.error || 'Streaming failed.');
+      }
+      if (eventName === 'done') {
+        reader.cancel();
+        return text;
+      }
+      if (payload.delta) {
+        text += payload.delta;
+        onText(text);
+      }
+    }
+  }
+  throw new Error('The connection closed before the response was complete.');
+};
+
 function App() {
   const [resumeFile, setResumeFile] = useState(null);
   const [jdOptions, setJdOptions] = useState([]); // Stores JD roles from backend
@@ -26,6 +76,7 @@ function App() {
   const [fitScoreOutput, setFitScoreOutput] = useState('');
   const [activeTab, setActiveTab] = useState('parse'); // Controls which tab content is visible
   const [loading, setLoading] = useState(false); // Global loading indicator
+  const [streaming, setStreaming] = useState(false); // An analysis is still arriving (the spinner is gone after its first chunk)
   const [error, setError] = useState(null); // Global error message
   const [showFullFitScoreReview, setShowFullFitScoreReview] = useState(false); // For Fit Score dropdown
 
@@ -254,7 +305,7 @@ function App() {
       const response = await fetch(`${API_BASE_URL}/resume_check`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ resume_text: resumeTextCache }),
+        body: JSON.stringify({ resume_text: resumeTextCache, jd_text: jdText }),
       });
       const data = await response.json();
       if (response.ok) {
@@ -305,25 +356,23 @@ function App() {
       return;
     }
     setLoading(true);
+    setStreaming(true);
     setError(null);
+    setInterviewQaOutput('');
+    setActiveTab('interview-qa'); // Show the Q&A tab while it streams in
     try {
-      const response = await fetch(`${API_BASE_URL}/generate_questions`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ resume_text: resumeTextCache, jd_text: jdText }),
+      const output = await streamAnalysis('/generate_questions/stream', { resume_text: resumeTextCache, jd_text: jdText }, (text) => {
+        setLoading(false); // First chunk is here: show the text instead of the spinner
+        setInterviewQaOutput(text);
       });
-      const data = await response.json();
-      if (response.ok) {
-        setInterviewQaOutput(data.output);
-        setActiveTab('interview-qa'); // Switch to Q&A tab after generation
-      } else {
-        setError(data.error || "Failed to generate questions.");
-      }
+      setInterviewQaOutput(output);
     } catch (err) {
       console.error("Error generating questions:", err);
+      setInterviewQaOutput(''); // Don't leave a partial answer that could be confirmed
       setError("Error generating questions: " + err.message);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -333,25 +382,23 @@ function App() {
       return;
     }
     setLoading(true);
+    setStreaming(true);
     setError(null);
+    setFitScoreOutput('');
     try {
-      const response = await fetch(`${API_BASE_URL}/fit_score`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ resume_text: resumeTextCache, jd_text: jdText }),
+      const output = await streamAnalysis('/fit_score/stream', { resume_text: resumeTextCache, jd_text: jdText }, (text) => {
+        setLoading(false); // First chunk is here: show the text instead of the spinner
+        setFitScoreOutput(text);
       });
-      const data = await response.json();
-      if (response.ok) {
-        setFitScoreOutput(data.output);
-        // No tab switch here, as the score output is visible in the input section
-      } else {
-        setError(data.error || "Failed to calculate fit score.");
-      }
+      setFitScoreOutput(output);
+      // No tab switch here, as the score output is visible in the input section
     } catch (err) {
       console.error("Error calculating fit score:", err);
+      setFitScoreOutput(''); // Don't leave a partial answer that could be confirmed
       setError("Error calculating fit score: " + err.message);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -414,10 +461,10 @@ function App() {
       try {
         const response = await fetch(`${API_BASE_URL}/get_interview_qa/${filename}`);
         if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const data = await response.json();
+        const qaContent = await response.text();
         // Temporarily store the QA content in the item for display
         setSavedResumes(prevResumes => prevResumes.map(resume =>
-          resume.id === id ? { ...resume, qa_content_display: data.qa_content } : resume
+          resume.id === id ? { ...resume, qa_content_display: qaContent } : resume
         ));
         setShowInterviewQaId(id);
       } catch (err) {
@@ -537,7 +584,7 @@ function App() {
             <div className="input-group score-input-group">
                 {/* Removed htmlFor attribute from label as it targets a button, not an input */}
                 <label>Calculate Resume Fit Score</label> 
-                <button onClick={handleFitScore} disabled={loading || !resumeTextCache || !jdText}>
+                <button onClick={handleFitScore} disabled={loading || streaming || !resumeTextCache || !jdText}>
                     {loading && activeTab === 'fit-score' ? 'Calculating...' : 'Get Fit Score'}
                 </button>
                 {fitScoreOutput && (
@@ -570,7 +617,7 @@ function App() {
                     <button
                         className="confirm-document-button"
                         onClick={handleConfirmDocument}
-                        disabled={loading}
+                        disabled={loading || streaming}
                     >
                         Confirm Document
                     </button>
@@ -700,7 +747,7 @@ function App() {
               <div className="tab-pane">
                 <h3>Interview Questions & Answers</h3>
                 {/* Add button to trigger generation */}
-                <button onClick={handleGenerateQuestions} disabled={loading || !resumeTextCache || !jdText}>
+                <button onClick={handleGenerateQuestions} disabled={loading || streaming || !resumeTextCache || !jdText}>
                     Generate Q&A
                 </button>
                 <div className="output-area markdown-output">